@@ -0,0 +1,251 @@
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+from lab2.main import Simulation
+from lab2.specs import ShipSpecs
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+SAMPLE = 2_000   # скільки разів повторюється кожна операція при вимірюванні
+REPEATS = 3      # скільки вимірювань робиться; береться найкраще (найменш зашумлене)
+
+# Очікуваний ріст часу ОДНІЄЇ операції як N^e, де N – кількість контейнерів у світі.
+# Порти масштабуються як sqrt(N), тому containers_by_type (сортування кошика порту) ~ N^0.5,
+# а print_state друкує весь світ ~ N^1.
+EXPECTED_EXPONENT = {
+    "create_container": 0.0,
+    "load": 0.0,
+    "unload": 0.0,
+    "sail": 0.0,
+    "getDistance": 0.0,
+    "containers_by_type": 0.5,
+    "print_state": 1.0,
+}
+GROWTH_TOLERANCE = 0.35   # допуск на показник степеня (шум вимірювань, кеші процесора)
+
+# Збережені результати для порівняння за замовчуванням (малі розміри, щоб оновлення було швидким):
+#   python -m lab2.bench --sizes 1000 10000 --out lab2/bench_baseline.json
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+# Верхні межі пам'яті на один об'єкт (байти, разом з його полями), які перевіряє --memory.
+# Без __slots__ було приблизно: контейнер 152, корабель 281, порожній порт 1160.
+MEMORY_BUDGET = {"container": 120, "ship": 250, "port": 1000}
+
+
+def build_world(n: int, seed: int = 0) -> Simulation:
+    """Синтетичний світ: n контейнерів, sqrt(n) портів, по кораблю на кожні 10 портів."""
+    rng = random.Random(seed)
+    n_ports = max(10, math.isqrt(n))
+    sim = Simulation()
+    for pid in range(n_ports):
+        sim.create_port(pid, rng.uniform(-60.0, 60.0), rng.uniform(-180.0, 180.0))
+    for i in range(n):
+        roll = rng.random()
+        kind = "R" if roll < 0.1 else "L" if roll < 0.2 else None
+        cid = sim.create_container(rng.randint(500, 9000), kind=kind)
+        sim.place_container_in_port(cid, i % n_ports)
+    big = ShipSpecs(10 ** 12, 0, 0, 0, 0, 1.0)
+    for sid in range(max(1, n_ports // 10)):
+        sim.create_ship(sid, sid * 10 % n_ports, big, fuel=10.0 ** 12)
+    return sim
+
+
+def _per_op(fn: Callable[[], int]) -> float:
+    start = time.perf_counter()
+    ops = fn()
+    return (time.perf_counter() - start) / max(ops, 1)
+
+
+def bench_size(n: int, seed: int = 0, sample: int = SAMPLE, repeats: int = REPEATS) -> Dict[str, float]:
+    """Час однієї операції (мкс) для кожної гарячої операції та пікова пам'ять побудови світу (МБ)."""
+    tracemalloc.start()
+    build_world(n, seed)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    sim = build_world(n, seed)
+    rng = random.Random(seed + 1)
+    results: Dict[str, float] = {"peak_memory_mb": peak / 2 ** 20}
+    n_ports = len(sim.ports)
+    ship = sim.ships[0]
+    port = ship.currentPort
+    candidates = [c.ID for c in port.containers][:sample]
+
+    def create():
+        for _ in range(sample):
+            sim.create_container(1000)
+        return sample
+
+    def load():
+        for cid in candidates:
+            sim.load(0, cid)
+        return len(candidates)
+
+    def unload():
+        for cid in candidates:
+            sim.unload(0, cid)
+        return len(candidates)
+
+    def sail():
+        # Порожній корабель ходить між двома портами
+        other = (port.ID + 1) % n_ports
+        for i in range(sample):
+            sim.sail(0, other if i % 2 == 0 else port.ID)
+        return sample
+
+    def distance():
+        ports = list(sim.ports.values())
+        pairs = [(rng.choice(ports), rng.choice(ports)) for _ in range(sample)]
+        start = time.perf_counter()
+        for a, b in pairs:
+            a.getDistance(b)
+        return (time.perf_counter() - start), sample
+
+    def by_type():
+        # Між викликами змінюємо кошик, щоб не міряти лише кеш відсортованих ID
+        cont = next(iter(port.containers))
+        calls = sample // 10
+        for _ in range(calls):
+            port.containers.remove(cont)
+            port.containers.add(cont)
+            port.containers_by_type()
+        return calls
+
+    def print_state():
+        with contextlib.redirect_stdout(io.StringIO()):
+            sim.print_state()
+        return 1
+
+    timings: Dict[str, List[float]] = {op: [] for op in EXPECTED_EXPONENT}
+    for _ in range(repeats):
+        timings["create_container"].append(_per_op(create))
+        timings["load"].append(_per_op(load))
+        timings["unload"].append(_per_op(unload))
+        timings["sail"].append(_per_op(sail))
+        elapsed, ops = distance()
+        timings["getDistance"].append(elapsed / ops)
+        timings["containers_by_type"].append(_per_op(by_type))
+    # Друк усього світу дорогий, тому вимірюється один раз
+    timings["print_state"].append(_per_op(print_state))
+    for op, values in timings.items():
+        results[op] = min(values) * 1e6
+    return results
+
+
+def _bytes_per_object(make: Callable[[int], object], n: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [make(i) for i in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / n - 8   # без посилання в самому списку
+
+
+def object_memory(n: int = 100_000) -> Dict[str, float]:
+    """Пам'ять на один Container, Ship і порожній Port (байти); ID та вага – великі числа, як у реальному світі."""
+    from lab2.containers import make_container
+    from lab2.port import Port
+    from lab2.ship import Ship
+    specs = ShipSpecs(20000, 10, 5, 2, 2, 1.0)
+    base = 10 ** 6
+    return {
+        "container": _bytes_per_object(lambda i: make_container(base + i, 1000 + i % 8000), n),
+        "ship": _bytes_per_object(lambda i: Ship(base + i, None, specs, fuel=100.0 + i), n // 10),
+        "port": _bytes_per_object(lambda i: Port(base + i, i % 90, i % 180), n // 10),
+    }
+
+
+def check_memory(memory: Dict[str, float]) -> List[str]:
+    return [f"{kind}: {memory[kind]:.0f} bytes per object, budget {budget}"
+            for kind, budget in MEMORY_BUDGET.items() if memory[kind] > budget]
+
+
+def run(sizes=DEFAULT_SIZES, seed: int = 0, log=None) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for n in sizes:
+        results[str(n)] = bench_size(n, seed)
+        if log is not None:
+            log(f"n={n}: " + ", ".join(f"{k}={v:.2f}" for k, v in results[str(n)].items()))
+    return results
+
+
+def check_growth(results: Dict[str, Dict[str, float]]) -> List[str]:
+    """Перевіряє, що час операції росте не швидше за очікуваний степінь N."""
+    problems = []
+    sizes = sorted(results, key=int)
+    for a, b in zip(sizes, sizes[1:]):
+        scale = math.log(int(b) / int(a))
+        for op, expected in EXPECTED_EXPONENT.items():
+            t_a, t_b = results[a][op], results[b][op]
+            if t_a <= 0 or t_b <= 0:
+                continue
+            exponent = math.log(t_b / t_a) / scale
+            if exponent > expected + GROWTH_TOLERANCE:
+                problems.append(f"{op}: n={a}->{b} grows as N^{exponent:.2f}, expected <= N^{expected}")
+    return problems
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float = 1.5) -> List[str]:
+    """Повертає список регресій: операції, що стали повільнішими за baseline більше ніж у threshold раз."""
+    problems = []
+    for size, ops in results.items():
+        base = baseline.get(size)
+        if base is None:
+            continue
+        for op, value in ops.items():
+            old = base.get(op)
+            if old and value > old * threshold:
+                problems.append(f"{op} at n={size}: {value:.2f} vs baseline {old:.2f} (x{value / old:.2f})")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Scaling benchmarks for lab2 simulation hot paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH,
+                        help="JSON results to compare against (default: committed lab2/bench_baseline.json; '' to skip)")
+    parser.add_argument("--threshold", type=float, default=1.5, help="allowed slowdown factor vs baseline")
+    parser.add_argument("--memory", action="store_true", help="only measure per-object memory against MEMORY_BUDGET")
+    args = parser.parse_args(argv)
+
+    log = lambda msg: print(msg, file=sys.stderr)
+    if args.memory:
+        memory = object_memory()
+        json.dump(memory, sys.stdout, indent=2)
+        print()
+        problems = check_memory(memory)
+        for p in problems:
+            log("FAIL " + p)
+        return 1 if problems else 0
+
+    results = run(args.sizes, args.seed, log)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    problems = check_growth(results)
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems += compare(results, json.load(f), args.threshold)
+    for p in problems:
+        log("FAIL " + p)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
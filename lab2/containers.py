@@ -3,8 +3,16 @@ from abc import ABC, abstractmethod
 
 CONSUMPTION_SCALE = 1.0 / 1000.0
 
+# Ключі типів контейнерів у тому порядку, в якому їх показують containers_by_type()
+TYPE_KEYS = ("basic_container", "heavy_container", "refrigerated_container", "liquid_container")
+# Цілочисельні коди типів (KIND) – індекси в TYPE_KEYS, використовуються в колонкових масивах
+KIND_BASIC, KIND_HEAVY, KIND_REFRIGERATED, KIND_LIQUID = range(4)
+
 # Абстрактний клас контейнера – базовий для всіх типів контейнерів
 class Container(ABC):
+    # Лише два поля на екземпляр, без __dict__ (підкласи додають тільки атрибути класу)
+    __slots__ = ("ID", "weight")
+
     def __init__(self, ID: int, weight: int) -> None:
         self.ID = ID               # унікальний ідентифікатор контейнера
         self.weight = int(weight)  # вага контейнера 
@@ -24,7 +32,10 @@ class Container(ABC):
 
 # Легкий контейнер (вага <= 3000 кг)
 class BasicContainer(Container):
+    __slots__ = ()
     RATE = 2.50  # коефіцієнт витрати палива на одиницю ваги
+    TYPE_KEY = "basic_container"  # ключ типу для групування без isinstance
+    KIND = KIND_BASIC             # цілочисельний код типу
 
     def consumption(self) -> float:
         # Витрати палива = вага * RATE * масштаб
@@ -32,21 +43,43 @@ class BasicContainer(Container):
 
 # Важкий контейнер
 class HeavyContainer(Container):
+    __slots__ = ()
     RATE = 3.00  # більший коефіцієнт витрати палива, ніж у BasicContainer
+    TYPE_KEY = "heavy_container"
+    KIND = KIND_HEAVY
 
     def consumption(self) -> float:
         return self.weight * HeavyContainer.RATE * CONSUMPTION_SCALE
 
 # Охолоджений контейнер – спеціальний тип важкого контейнера
 class RefrigeratedContainer(HeavyContainer):
+    __slots__ = ()
     RATE = 5.00  # ще більші витрати палива через холодильне обладнання
+    TYPE_KEY = "refrigerated_container"
+    KIND = KIND_REFRIGERATED
 
     def consumption(self) -> float:
         return self.weight * RefrigeratedContainer.RATE * CONSUMPTION_SCALE
 
 # Рідинний контейнер – спец тип важкого контейнера
 class LiquidContainer(HeavyContainer):
+    __slots__ = ()
     RATE = 4.00  
+    TYPE_KEY = "liquid_container"
+    KIND = KIND_LIQUID
 
     def consumption(self) -> float:
         return self.weight * LiquidContainer.RATE * CONSUMPTION_SCALE
+
+# Класи контейнерів за кодом KIND
+KIND_CLASSES = (BasicContainer, HeavyContainer, RefrigeratedContainer, LiquidContainer)
+
+
+def make_container(ID: int, weight: int, kind=None) -> Container:
+    """Створює контейнер за кодом: "R" – холодильний, "L" – рідкий, інакше базовий або важкий за вагою."""
+    if kind == "R":
+        return RefrigeratedContainer(ID, weight)
+    if kind == "L":
+        return LiquidContainer(ID, weight)
+    # Визначає базовий чи важкий контейнер залежно від ваги
+    return BasicContainer(ID, weight) if weight <= 3000 else HeavyContainer(ID, weight)
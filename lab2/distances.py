@@ -0,0 +1,104 @@
+from __future__ import annotations
+from typing import Dict, Iterable
+
+try:
+    import numpy as np
+except ImportError:  # без numpy відстані рахуються скалярно в Port.getDistance
+    np = None
+
+EARTH_RADIUS_KM = 6371  # радіус Землі в км (той самий, що й у Port.getDistance)
+
+MAX_CACHED_PORTS = 4096  # межа кешу за замовчуванням: 4096^2 * 8 байт = 128 МіБ
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Векторна формула гаверсина; координати в радіанах, результат у км."""
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    a = np.clip(a, 0.0, 1.0)
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+class DistanceMatrix:
+    """
+    Кеш відстаней між усіма зареєстрованими портами.
+    При додаванні порту рахується лише новий рядок і стовпець (одним векторним викликом),
+    далі відстань між будь-якою парою портів – просте читання з матриці.
+    Матриця займає N^2 * 8 байт, тому розмір обмежено max_ports: заповнений кеш (full)
+    нових портів не приймає, і Simulation тоді вимикає його та переходить на скалярні відстані.
+    """
+
+    def __init__(self, capacity: int = 64, max_ports: int = MAX_CACHED_PORTS) -> None:
+        if np is None:
+            raise ImportError("numpy is required for DistanceMatrix")
+        self.max_ports = max(int(max_ports), 1)
+        capacity = min(max(int(capacity), 1), self.max_ports)
+        self._n = 0
+        self._index: Dict[int, int] = {}   # ID порту -> номер рядка
+        self._lat = np.empty(capacity)     # широта в радіанах
+        self._lon = np.empty(capacity)     # довгота в радіанах
+        self._matrix = np.zeros((capacity, capacity))
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __contains__(self, port_id: int) -> bool:
+        return port_id in self._index
+
+    @property
+    def full(self) -> bool:
+        return self._n >= self.max_ports
+
+    def _grow(self) -> None:
+        n = self._n
+        capacity = min(len(self._lat) * 2, self.max_ports)
+        lat, lon = np.empty(capacity), np.empty(capacity)
+        lat[:n], lon[:n] = self._lat[:n], self._lon[:n]
+        matrix = np.zeros((capacity, capacity))
+        matrix[:n, :n] = self._matrix[:n, :n]
+        self._lat, self._lon, self._matrix = lat, lon, matrix
+
+    def add_port(self, port_id: int, latitude: float, longitude: float) -> None:
+        if port_id in self._index:
+            raise ValueError(f"Port {port_id} already in distance matrix")
+        if self.full:
+            raise ValueError(f"Distance matrix is full ({self.max_ports} ports)")
+        if self._n == len(self._lat):
+            self._grow()
+        i = self._n
+        self._lat[i] = np.radians(latitude)
+        self._lon[i] = np.radians(longitude)
+        self._n += 1
+        # Новий рядок і стовпець – відстані від нового порту до всіх інших
+        row = haversine(self._lat[i], self._lon[i], self._lat[:self._n], self._lon[:self._n])
+        row[i] = 0.0
+        self._matrix[i, :self._n] = row
+        self._matrix[:self._n, i] = row
+        self._index[port_id] = i
+
+    def get(self, from_id: int, to_id: int) -> float:
+        return float(self._matrix[self._index[from_id], self._index[to_id]])
+
+    def _rows(self, port_ids: Iterable[int]):
+        index = self._index
+        return np.fromiter((index[pid] for pid in port_ids), dtype=np.int64)
+
+    def distances(self, from_ids: Iterable[int], to_ids: Iterable[int]):
+        """Матриця відстаней len(from_ids) x len(to_ids) у км."""
+        return self._matrix[np.ix_(self._rows(from_ids), self._rows(to_ids))]
+
+    def index_of(self, port_id: int) -> int:
+        return self._index[port_id]
+
+    def view(self):
+        """Квадратна матриця N x N (без копіювання) у порядку port_ids()."""
+        return self._matrix[:self._n, :self._n]
+
+    def row(self, port_id: int):
+        """Відстані від порту до всіх портів у порядку реєстрації (див. port_ids)."""
+        return self._matrix[self._index[port_id], :self._n]
+
+    def port_ids(self):
+        """ID портів у порядку рядків матриці."""
+        return list(self._index)
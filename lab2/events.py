@@ -0,0 +1,145 @@
+from __future__ import annotations
+import heapq
+from contextlib import contextmanager
+from itertools import count
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+# Типи подій (індекси в таблиці обробників EventEngine)
+DEPART, ARRIVE, LOAD, UNLOAD, REFUEL, CALL = range(6)
+EVENT_NAMES = ("depart", "arrive", "load", "unload", "refuel", "call")
+
+# Оброблена подія: (час, тип, аргумент 1, аргумент 2, результат)
+Event = Tuple[float, int, Any, Any, Any]
+
+
+class EventEngine:
+    """
+    Дискретно-подійна симуляція поверх Simulation.
+    Події зберігаються в купі за часом (години); при однаковому часі виконуються в порядку планування.
+    Рейс складається з двох подій: відправлення (паливо, outgoingShip) і прибуття через
+    distance / speedKMPerHour годин (вивантаження вантажу, incomingShip).
+    """
+
+    def __init__(self, sim, on_event: Optional[Callable[[Event], None]] = None) -> None:
+        self.sim = sim
+        self.now = 0.0
+        self.on_event = on_event          # необов'язковий обробник кожної виконаної події
+        self.processed = 0
+        self._queue: List[tuple] = []
+        self._seq = count()
+        self._handlers = (self._depart, self._arrive, self._load, self._unload, self._refuel, self._call)
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def schedule(self, time: float, kind: int, a: Any = None, b: Any = None) -> None:
+        if time < self.now:
+            raise ValueError("Cannot schedule event in the past")
+        heapq.heappush(self._queue, (time, next(self._seq), kind, a, b))
+
+    def schedule_sail(self, time: float, ship_id: int, dest_port_id: int) -> None:
+        """Відправлення в момент time; прибуття плануємо автоматично, якщо рейс почався."""
+        self.schedule(time, DEPART, ship_id, dest_port_id)
+
+    def schedule_load(self, time: float, ship_id: int, container_ids: Iterable[int]) -> None:
+        self.schedule(time, LOAD, ship_id, list(container_ids))
+
+    def schedule_unload(self, time: float, ship_id: int, container_ids: Iterable[int]) -> None:
+        self.schedule(time, UNLOAD, ship_id, list(container_ids))
+
+    def schedule_refuel(self, time: float, ship_id: int, amount: float) -> None:
+        self.schedule(time, REFUEL, ship_id, amount)
+
+    def schedule_call(self, time: float, fn: Callable[..., Any], *args: Any) -> None:
+        """Довільна дія в момент time: fn(engine, *args)."""
+        self.schedule(time, CALL, fn, args)
+
+    def voyage_time(self, ship, dest) -> float:
+        """Тривалість рейсу в годинах."""
+        speed = ship.specs.speedKMPerHour
+        if speed <= 0:
+            raise ValueError("Ship speed must be positive")
+        return ship.currentPort.getDistance(dest) / speed
+
+    # --- обробники подій ---
+
+    def _depart(self, ship_id, dest_port_id):
+        sim = self.sim
+        ship = sim.ships.get(ship_id)
+        dest = sim.ports.get(dest_port_id)
+        # Тривалість рахуємо до відправлення, поки корабель ще в порту; саме відправлення –
+        # через Simulation.depart, щоб метрики врахували рейс і причину відмови
+        duration = None
+        if ship is not None and dest is not None and ship.currentPort is not None:
+            duration = self.voyage_time(ship, dest)
+        if not sim.depart(ship_id, dest_port_id):
+            return False
+        heapq.heappush(self._queue, (self.now + duration, next(self._seq), ARRIVE, ship_id, dest_port_id))
+        return True
+
+    def _arrive(self, ship_id, dest_port_id):
+        return self.sim.arrive(ship_id, dest_port_id)
+
+    def _load(self, ship_id, container_ids):
+        return self.sim.load_many(ship_id, container_ids)
+
+    def _unload(self, ship_id, container_ids):
+        unload = self.sim.unload
+        return [cid for cid in container_ids if unload(ship_id, cid)]
+
+    def _refuel(self, ship_id, amount):
+        return self.sim.refuel(ship_id, amount)
+
+    def _call(self, fn, args):
+        return fn(self, *args)
+
+    # --- виконання ---
+
+    @contextmanager
+    def _ledger_clock(self):
+        # Поки виконуються події, візити в журналі портів записуються за часом симуляції;
+        # після цього журнал повертається до свого годинника
+        ledger = getattr(self.sim, "ledger", None)
+        if ledger is None:
+            yield
+            return
+        previous = ledger.clock
+        ledger.clock = lambda: self.now
+        try:
+            yield
+        finally:
+            ledger.clock = previous
+
+    def step(self) -> Optional[Event]:
+        """Виконує найближчу подію і повертає її разом з результатом (None, якщо черга порожня)."""
+        if not self._queue:
+            return None
+        time, _, kind, a, b = heapq.heappop(self._queue)
+        self.now = time
+        with self._ledger_clock():
+            result = self._handlers[kind](a, b)
+        self.processed += 1
+        event = (time, kind, a, b, result)
+        if self.on_event is not None:
+            self.on_event(event)
+        return event
+
+    def run_until(self, until: float) -> int:
+        """Виконує всі події з часом <= until і переводить годинник на until. Повертає кількість подій."""
+        queue = self._queue
+        handlers = self._handlers
+        on_event = self.on_event
+        pop = heapq.heappop
+        done = 0
+        with self._ledger_clock():
+            while queue and queue[0][0] <= until:
+                time, _, kind, a, b = pop(queue)
+                self.now = time
+                result = handlers[kind](a, b)
+                done += 1
+                if on_event is not None:
+                    on_event((time, kind, a, b, result))
+        self.processed += done
+        if until > self.now:
+            self.now = until
+        return done
@@ -0,0 +1,180 @@
+from __future__ import annotations
+import csv
+import io
+import json
+from typing import Dict, List, TextIO
+from lab2.containers import TYPE_KEYS
+
+try:
+    import numpy as np
+except ImportError:  # numpy потрібен лише для колонкового формату
+    np = None
+
+FORMATS = ("text", "jsonl", "csv", "columnar")
+CSV_FIELDS = ("record", "id", "port", "latitude", "longitude", "fuel", "ships") + TYPE_KEYS
+
+# Короткі назви типів у текстовому форматі (як у старому print_state)
+_TEXT_LABELS = (("basic_container", "basic"), ("heavy_container", "heavy"),
+                ("refrigerated_container", "refrigerated"), ("liquid_container", "liquid"))
+
+
+class _BufferedWriter:
+    """Накопичує рядки і пише їх у потік великими шматками замість окремого write на кожен рядок."""
+
+    def __init__(self, out: TextIO, limit: int = 1 << 20) -> None:
+        self.out = out
+        self.limit = limit
+        self._parts: List[str] = []
+        self._size = 0
+
+    def write(self, text: str) -> None:
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self.limit:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._parts:
+            self.out.write("".join(self._parts))
+            self._parts.clear()
+            self._size = 0
+
+
+def port_record(p) -> Dict:
+    return {"record": "port", "id": p.ID, "latitude": p.latitude, "longitude": p.longitude,
+            "ships": sorted(s.ID for s in p.current), **p.containers_by_type()}
+
+
+def ship_record(s) -> Dict:
+    return {"record": "ship", "id": s.ID, "port": s.currentPort.ID if s.currentPort is not None else None,
+            "fuel": s.fuel, **s.containers_by_type()}
+
+
+def port_text(p) -> str:
+    """Текстовий блок одного порту (як у print_state): контейнери за типами і кораблі в порту."""
+    parts = [f"Port {p.ID}: lat={p.latitude:.2f}, lon={p.longitude:.2f}\n"]
+    w = parts.append
+    types = p.containers_by_type()
+    w("  Containers at port:\n")
+    for key, label in _TEXT_LABELS:
+        w(f"    {label}: {types[key]}\n")
+    if p.current:
+        w("  Ships in port:\n")
+        for s in sorted(p.current, key=lambda x: x.ID):
+            w(f"    Ship {s.ID}: fuel_left={s.fuel:.2f}\n")
+            sc = s.containers_by_type()
+            for key, label in _TEXT_LABELS:
+                w(f"      {label}: {sc[key]}\n")
+    else:
+        w("  (no ships)\n")
+    return "".join(parts)
+
+
+class StateExporter:
+    """
+    Експорт стану симуляції в текст (як print_state), JSON Lines, CSV або колонковий файл (.npz).
+    delta=True виводить лише порти й кораблі, що змінилися з часу попереднього експорту
+    (за прапорцями _dirty у Port, Ship і ContainerStore); експорт з mark=True ці прапорці скидає.
+    """
+
+    def __init__(self, sim, fmt: str = "jsonl") -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format {fmt!r}")
+        if fmt == "columnar" and np is None:
+            raise ImportError("numpy is required for columnar export")
+        self.sim = sim
+        self.fmt = fmt
+
+    def _select(self, delta: bool, mark: bool):
+        sim = self.sim
+        ports = [sim.ports[pid] for pid in sorted(sim.ports)]
+        ships = [sim.ships[sid] for sid in sorted(sim.ships)]
+        if delta:
+            ports = [p for p in ports if p.is_dirty()]
+            ships = [s for s in ships if s._dirty]
+        if mark:
+            for p in ports:
+                p.mark_clean()
+            for s in ships:
+                s._dirty = False
+        return ports, ships
+
+    def export(self, out, delta: bool = False, mark: bool = True) -> int:
+        """
+        Пише стан у out (текстовий потік; для колонкового формату – шлях або бінарний потік).
+        mark=False не скидає прапорці змін (наприклад, для print_state).
+        Повертає кількість записаних портів і кораблів.
+        """
+        ports, ships = self._select(delta, mark)
+        if self.fmt == "columnar":
+            self._write_columnar(out, ports, ships)
+        else:
+            writer = _BufferedWriter(out)
+            if self.fmt == "text":
+                self._write_text(writer, ports, ships if delta else [])
+            elif self.fmt == "jsonl":
+                dumps = json.dumps
+                for p in ports:
+                    writer.write(dumps(port_record(p)) + "\n")
+                for s in ships:
+                    writer.write(dumps(ship_record(s)) + "\n")
+            else:
+                self._write_csv(writer, ports, ships)
+            writer.flush()
+        return len(ports) + len(ships)
+
+    @staticmethod
+    def _write_text(writer: _BufferedWriter, ports, ships) -> None:
+        w = writer.write
+        for p in ports:
+            w(port_text(p))
+        # У режимі змін окремо показуємо змінені кораблі (зокрема ті, що в морі)
+        for s in ships:
+            where = s.currentPort.ID if s.currentPort is not None else "at sea"
+            w(f"Ship {s.ID}: port={where}, fuel_left={s.fuel:.2f}\n")
+
+    @staticmethod
+    def _write_csv(writer: _BufferedWriter, ports, ships) -> None:
+        buf = io.StringIO()
+        rows = csv.writer(buf)
+        rows.writerow(CSV_FIELDS)
+        join = " ".join
+        for p in ports:
+            types = p.containers_by_type()
+            rows.writerow(["port", p.ID, "", p.latitude, p.longitude, "", join(str(s.ID) for s in p.current)]
+                          + [join(map(str, types[k])) for k in TYPE_KEYS])
+        for s in ships:
+            types = s.containers_by_type()
+            port = s.currentPort.ID if s.currentPort is not None else ""
+            rows.writerow(["ship", s.ID, port, "", "", s.fuel, ""] + [join(map(str, types[k])) for k in TYPE_KEYS])
+        writer.write(buf.getvalue())
+
+    @staticmethod
+    def _write_columnar(out, ports, ships) -> None:
+        # Списки ID різної довжини зберігаються як плоский масив + зсуви (offsets) для кожного запису
+        def ragged(records, key):
+            flat, offsets = [], [0]
+            for r in records:
+                flat.extend(r[key])
+                offsets.append(len(flat))
+            return np.array(flat, dtype=np.int64), np.array(offsets, dtype=np.int64)
+
+        port_recs = [port_record(p) for p in ports]
+        ship_recs = [ship_record(s) for s in ships]
+        arrays = {
+            "port_id": np.array([r["id"] for r in port_recs], dtype=np.int64),
+            "port_latitude": np.array([r["latitude"] for r in port_recs], dtype=np.float64),
+            "port_longitude": np.array([r["longitude"] for r in port_recs], dtype=np.float64),
+            "ship_id": np.array([r["id"] for r in ship_recs], dtype=np.int64),
+            "ship_port": np.array([-1 if r["port"] is None else r["port"] for r in ship_recs], dtype=np.int64),
+            "ship_fuel": np.array([r["fuel"] for r in ship_recs], dtype=np.float64),
+        }
+        arrays["port_ships"], arrays["port_ships_offsets"] = ragged(port_recs, "ships")
+        for key in TYPE_KEYS:
+            arrays[f"port_{key}"], arrays[f"port_{key}_offsets"] = ragged(port_recs, key)
+            arrays[f"ship_{key}"], arrays[f"ship_{key}_offsets"] = ragged(ship_recs, key)
+        np.savez(out, **arrays)
+
+
+def export_state(sim, out, fmt: str = "jsonl", delta: bool = False, mark: bool = True) -> int:
+    return StateExporter(sim, fmt).export(out, delta, mark)
@@ -0,0 +1,232 @@
+from __future__ import annotations
+import csv
+import json
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from lab2.specs import ShipSpecs
+
+# Команда – словник з полем "op" та аргументами; поля однакові для JSON Lines і CSV (заголовок):
+#   create_port:      id, lat, lon
+#   create_ship:      id, port, capacity, max_all, max_heavy, max_refrigerated, max_liquid,
+#                     fuel_per_km, [speed], [fuel]
+#   create_container: weight, [kind]               -> результат: ID контейнера
+#   place:            container, port
+#   load / unload:    ship, container
+#   refuel:           ship, amount
+#   sail:             ship, port
+Command = Dict[str, Any]
+
+
+def read_jsonl(f, start: int = 0) -> Iterator[Tuple[int, Command]]:
+    """
+    Читає команди з бінарного файлу JSON Lines; віддає (зсув після рядка, команда).
+    Замість рядка, що не розбирається як JSON, віддається виняток – apply_commands запише його
+    як невдалу команду, і відтворення піде далі.
+    """
+    f.seek(start)
+    offset = start
+    for line in f:
+        offset += len(line)
+        if line.strip():
+            try:
+                yield offset, json.loads(line)
+            except ValueError as e:   # JSONDecodeError і UnicodeDecodeError
+                yield offset, e
+
+
+def read_csv(f, start: int = 0) -> Iterator[Tuple[int, Command]]:
+    """Читає команди з бінарного CSV-файлу з рядком заголовка; порожні поля пропускаються."""
+    f.seek(0)
+    header_line = f.readline()
+    header = next(csv.reader([header_line.decode()]))
+    offset = max(start, len(header_line))
+    f.seek(offset)
+    for line in f:
+        offset += len(line)
+        try:
+            row = next(csv.reader([line.decode()]), None)
+        except (ValueError, csv.Error) as e:
+            yield offset, e
+            continue
+        if row:
+            yield offset, {k: v for k, v in zip(header, row) if v != ""}
+
+
+def _create_port(sim, c):
+    sim.create_port(int(c["id"]), float(c["lat"]), float(c["lon"]))
+    return True
+
+
+def _create_ship(sim, c):
+    specs = ShipSpecs(int(c["capacity"]), int(c["max_all"]), int(c["max_heavy"]),
+                      int(c["max_refrigerated"]), int(c["max_liquid"]), float(c["fuel_per_km"]),
+                      float(c.get("speed", 37.0)))
+    sim.create_ship(int(c["id"]), int(c["port"]), specs, fuel=float(c.get("fuel", 0.0)))
+    return True
+
+
+def _create_container(sim, c):
+    return sim.create_container(int(c["weight"]), kind=c.get("kind") or None)
+
+
+def _place(sim, c):
+    sim.place_container_in_port(int(c["container"]), int(c["port"]))
+    return True
+
+
+def _load(sim, c):
+    return sim.load(int(c["ship"]), int(c["container"]))
+
+
+def _unload(sim, c):
+    return sim.unload(int(c["ship"]), int(c["container"]))
+
+
+def _refuel(sim, c):
+    return sim.refuel(int(c["ship"]), float(c["amount"]))
+
+
+def _sail(sim, c):
+    return sim.sail(int(c["ship"]), int(c["port"]))
+
+
+HANDLERS: Dict[str, Callable[[Any, Command], Any]] = {
+    "create_port": _create_port,
+    "create_ship": _create_ship,
+    "create_container": _create_container,
+    "place": _place,
+    "load": _load,
+    "unload": _unload,
+    "refuel": _refuel,
+    "sail": _sail,
+}
+
+
+def _load_args(cmd: Command) -> Optional[Tuple[int, int]]:
+    # (корабель, контейнер) для команди load, яку можна об'єднати в load_many; None – не load або хибні поля
+    if not isinstance(cmd, dict) or cmd.get("op") != "load":
+        return None
+    try:
+        return int(cmd["ship"]), int(cmd["container"])
+    except (ValueError, KeyError, TypeError, OverflowError):
+        return None
+
+
+def _error_text(e: Exception) -> str:
+    # Очікувані помилки вхідних даних – просто текст; решта – з назвою типу винятку
+    if isinstance(e, (ValueError, KeyError, TypeError, OverflowError)):
+        return str(e)
+    return f"{type(e).__name__}: {e}"
+
+
+def apply_commands(sim, batch: List[Tuple[int, Command]]) -> List[Tuple[int, Command, bool, Any]]:
+    """
+    Виконує порцію команд (зсув, команда) і повертає (зсув, команда, успіх, результат) у тому ж порядку.
+    Послідовні команди load для одного корабля об'єднуються в один виклик load_many.
+    Помилкова команда (не об'єкт JSON, невідома op, хибні чи відсутні поля) або виняток в обробнику
+    лише дає цій команді невдалий результат з текстом помилки; решта порції виконується як звичайно.
+    """
+    results = []
+    i, n = 0, len(batch)
+    while i < n:
+        offset, cmd = batch[i]
+        args = _load_args(cmd)
+        if args is not None:
+            # Збираємо серію завантажень на той самий корабель
+            ship_id = args[0]
+            ids = [args[1]]
+            j = i + 1
+            while j < n:
+                nxt = _load_args(batch[j][1])
+                if nxt is None or nxt[0] != ship_id:
+                    break
+                ids.append(nxt[1])
+                j += 1
+            try:
+                accepted, _ = sim.load_many(ship_id, ids)
+            except Exception as e:
+                results.extend((off, c, False, _error_text(e)) for off, c in batch[i:j])
+                i = j
+                continue
+            k = 0
+            for (off, c), cid in zip(batch[i:j], ids):
+                ok = k < len(accepted) and accepted[k] == cid
+                if ok:
+                    k += 1
+                results.append((off, c, ok, ok))
+            i = j
+            continue
+        try:
+            if isinstance(cmd, Exception):
+                raise ValueError(f"Bad command line: {cmd}")
+            if not isinstance(cmd, dict):
+                raise TypeError("Command must be a JSON object")
+            op = cmd.get("op")
+            handler = HANDLERS.get(op) if isinstance(op, str) else None
+            if handler is None:
+                raise ValueError(f"Unknown op {op!r}")
+            result = handler(sim, cmd)
+            results.append((offset, cmd, result is not False, result))
+        except Exception as e:
+            results.append((offset, cmd, False, _error_text(e)))
+        i += 1
+    return results
+
+
+class Replayer:
+    """
+    Відтворює потік команд на Simulation порціями по batch_size.
+    Послідовні команди load для одного корабля об'єднуються в один виклик load_many.
+    Результат кожної команди (за наявності out) пишеться рядком JSON; після кожної порції
+    викликається checkpoint(зсув) – з цього зсуву можна продовжити відтворення.
+    """
+
+    def __init__(self, sim, out: Optional[TextIO] = None, batch_size: int = 4096,
+                 checkpoint: Optional[Callable[[int], None]] = None) -> None:
+        self.sim = sim
+        self.out = out
+        self.batch_size = int(batch_size)
+        self.checkpoint = checkpoint
+        self.commands = 0
+        self.ok = 0
+        self.failed = 0
+
+    def _apply(self, batch: List[Tuple[int, Command]]) -> List[Tuple[int, Command, bool, Any]]:
+        return apply_commands(self.sim, batch)
+
+    def _record(self, results) -> None:
+        ok = sum(1 for r in results if r[2])
+        self.commands += len(results)
+        self.ok += ok
+        self.failed += len(results) - ok
+        if self.out is not None:
+            dumps = json.dumps
+            self.out.write("".join(
+                dumps({"offset": off, "op": cmd.get("op") if isinstance(cmd, dict) else None,
+                       "ok": success, "result": result}) + "\n"
+                for off, cmd, success, result in results))
+
+    def run(self, commands: Iterable[Tuple[int, Command]], start: int = 0) -> int:
+        """Відтворює команди та повертає зсув після останньої виконаної."""
+        offset = start
+        it = iter(commands)
+        while True:
+            batch = list(islice(it, self.batch_size))
+            if not batch:
+                return offset
+            self._record(self._apply(batch))
+            offset = batch[-1][0]
+            if self.checkpoint is not None:
+                self.checkpoint(offset)
+
+    def replay(self, path: str, fmt: Optional[str] = None, start: int = 0) -> int:
+        """Відтворює файл команд (формат за розширенням: .csv або JSON Lines) з байтового зсуву start."""
+        fmt = fmt or ("csv" if path.endswith(".csv") else "jsonl")
+        reader = read_csv if fmt == "csv" else read_jsonl
+        with open(path, "rb") as f:
+            return self.run(reader(f, start), start)
+
+
+def replay(sim, path: str, out: Optional[TextIO] = None, start: int = 0, fmt: Optional[str] = None,
+           batch_size: int = 4096, checkpoint: Optional[Callable[[int], None]] = None) -> int:
+    return Replayer(sim, out, batch_size, checkpoint).replay(path, fmt, start)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+import math
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Запис візиту: (ID корабля, ID порту, час прибуття, час відправлення або None, якщо корабель ще в порту)
+Visit = Tuple[int, int, float, Optional[float]]
+
+
+class TrafficLedger:
+    """
+    Журнал заходів кораблів у порти, спільний для всіх портів Simulation.
+    Візити дописуються в кінець компактних колонок array (корабель, порт, прибуття, відправлення);
+    для портів і кораблів ведуться списки номерів рядків, тому запити не проходять увесь журнал.
+    Час береться з clock() (наприклад, EventEngine.now); без нього – номер події в журналі.
+    max_records обмежує пам'ять: коли закритих візитів стає більше, старіша їх половина
+    відкидається (перед цим її отримує on_rollover), а лічильники візитів лишаються повними.
+    Відкриті візити (кораблі, що зараз у портах) під обмеження не підпадають – їх не більше,
+    ніж кораблів, і відкинути їх не можна.
+    """
+
+    def __init__(self, max_records: Optional[int] = None, clock: Optional[Callable[[], float]] = None,
+                 on_rollover: Optional[Callable[[List[Visit]], None]] = None) -> None:
+        if max_records is not None and max_records < 2:
+            raise ValueError("max_records must be at least 2")
+        self.max_records = max_records
+        self.clock = clock
+        self.on_rollover = on_rollover
+        self._ticks = 0
+        self._base = 0                     # абсолютний номер першого збереженого рядка
+        self._ship = array("q")
+        self._port = array("q")
+        self._arrival = array("d")
+        self._departure = array("d")       # NaN – візит ще відкритий
+        self._open: Dict[int, int] = {}    # ID корабля -> абсолютний номер рядка відкритого візиту
+        self._by_port: Dict[int, array] = {}
+        self._by_ship: Dict[int, array] = {}
+        self._port_visits: Dict[int, int] = {}   # усі візити за весь час, включно з відкинутими
+
+    def _now(self) -> float:
+        self._ticks += 1
+        return float(self.clock()) if self.clock is not None else float(self._ticks)
+
+    def __len__(self) -> int:
+        return len(self._ship)
+
+    def arrive(self, ship_id: int, port_id: int) -> None:
+        """Відкриває візит корабля в порт."""
+        row = self._base + len(self._ship)
+        self._ship.append(ship_id)
+        self._port.append(port_id)
+        self._arrival.append(self._now())
+        self._departure.append(math.nan)
+        self._open[ship_id] = row
+        index = self._by_port.get(port_id)
+        if index is None:
+            index = self._by_port[port_id] = array("q")
+        index.append(row)
+        index = self._by_ship.get(ship_id)
+        if index is None:
+            index = self._by_ship[ship_id] = array("q")
+        index.append(row)
+        self._port_visits[port_id] = self._port_visits.get(port_id, 0) + 1
+
+    def depart(self, ship_id: int, port_id: int) -> None:
+        """Закриває відкритий візит корабля в порт (якщо такий є)."""
+        row = self._open.get(ship_id)
+        if row is None or self._port[row - self._base] != port_id:
+            return
+        del self._open[ship_id]
+        self._departure[row - self._base] = self._now()
+        if self.max_records is not None and len(self._ship) - len(self._open) > self.max_records:
+            self._rollover()
+
+    def _record(self, row: int) -> Visit:
+        i = row - self._base
+        dep = self._departure[i]
+        return self._ship[i], self._port[i], self._arrival[i], None if math.isnan(dep) else dep
+
+    def visit_count(self, port_id: int) -> int:
+        """Скільки разів кораблі заходили в порт за весь час (відкинуті записи теж враховані)."""
+        return self._port_visits.get(port_id, 0)
+
+    def visits(self, port_id: int) -> List[Visit]:
+        """Збережені візити в порт у порядку журналу."""
+        return [self._record(row) for row in self._by_port.get(port_id, ())]
+
+    def last_visitors(self, port_id: int, n: int = 10) -> List[int]:
+        """ID кораблів з останніх n візитів у порт, від найновішого."""
+        rows = self._by_port.get(port_id)
+        if not rows or n <= 0:
+            return []
+        ship = self._ship
+        base = self._base
+        return [ship[row - base] for row in reversed(rows[-n:])]
+
+    def itinerary(self, ship_id: int) -> List[Visit]:
+        """Збережені візити корабля в порядку журналу."""
+        return [self._record(row) for row in self._by_ship.get(ship_id, ())]
+
+    def _rollover(self) -> None:
+        # Відкидаємо старішу половину закритих візитів. Відкриті візити (корабель досі в порту)
+        # лишаються на своїх місцях, тож журнал і індекси зберігають порядок прибуття.
+        departure = self._departure
+        target = (len(self._ship) - len(self._open)) // 2
+        closed = cut = 0
+        while closed < target:
+            if not math.isnan(departure[cut]):
+                closed += 1
+            cut += 1
+        keep = [i for i in range(cut) if math.isnan(departure[i])]
+        keep.extend(range(cut, len(self._ship)))
+        base = self._base
+        dropped = [self._record(base + i) for i in range(cut) if not math.isnan(departure[i])]
+
+        # Нові номери рядків: наступне прибуття отримає той самий номер, що й без відкидання
+        new_base = base + len(self._ship) - len(keep)
+        renumber = {base + i: new_base + k for k, i in enumerate(keep)}
+        self._ship = array("q", (self._ship[i] for i in keep))
+        self._port = array("q", (self._port[i] for i in keep))
+        self._arrival = array("d", (self._arrival[i] for i in keep))
+        self._departure = array("d", (departure[i] for i in keep))
+        self._base = new_base
+        self._open = {sid: renumber[row] for sid, row in self._open.items()}
+
+        # Перебудовуємо індекси лише зі збережених рядків
+        self._by_port = {}
+        self._by_ship = {}
+        port, ship = self._port, self._ship
+        for row in range(new_base, new_base + len(ship)):
+            i = row - new_base
+            self._by_port.setdefault(port[i], array("q")).append(row)
+            self._by_ship.setdefault(ship[i], array("q")).append(row)
+        if self.on_rollover is not None:
+            self.on_rollover(dropped)
@@ -0,0 +1,221 @@
+from __future__ import annotations
+import math
+import time
+from functools import reduce
+from heapq import heapify, heappop, heappush
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from lab2.containers import Container, KIND_BASIC, KIND_HEAVY, KIND_REFRIGERATED, KIND_LIQUID
+
+try:
+    import numpy as np
+except ImportError:  # без numpy використовується лише евристика
+    np = None
+
+# Порядок застосування плану: звичайні важкі контейнери мають іти раніше за холодильні
+# та рідкі, бо Ship._reject_reason рахує ліміт важких разом з уже завантаженими R і L.
+_APPLY_ORDER = {KIND_HEAVY: 0, KIND_BASIC: 1, KIND_REFRIGERATED: 2, KIND_LIQUID: 3}
+
+ValueFn = Callable[[Container], float]
+
+_DP_CELLS = 4_000_000   # максимальний розмір таблиці DP (кількість контейнерів x кроки ваги)
+_DP_MIN_STEPS = 200     # менше кроків ваги DP не має сенсу – лишаємо евристику
+
+
+def _free(limit: int, used: int) -> float:
+    # 0 у ShipSpecs означає "без обмеження"
+    return math.inf if limit == 0 else max(limit - used, 0)
+
+
+def _limits(ship) -> Tuple[List[float], float, int]:
+    """Вільне місце на кораблі: (ліміти за KIND, загальна кількість, вага)."""
+    specs = ship.specs
+    kind_caps = [math.inf, 0.0, 0.0, 0.0]
+    kind_caps[KIND_HEAVY] = _free(specs.maxNumberOfHeavyContainers, ship._heavy)
+    kind_caps[KIND_REFRIGERATED] = _free(specs.maxNumberOfRefrigeratedContainers, ship._refrigerated)
+    kind_caps[KIND_LIQUID] = _free(specs.maxNumberOfLiquidContainers, ship._liquid)
+    total = _free(specs.maxNumberOfAllContainers, len(ship._containers))
+    return kind_caps, total, specs.totalWeightCapacity - ship._weight_sum
+
+
+class _Selection:
+    """Поточний набір вибраних контейнерів разом з лічильниками для перевірки лімітів."""
+
+    def __init__(self, kind_caps: List[float], total_cap: float, weight_cap: int) -> None:
+        self.kind_caps = kind_caps
+        self.total_cap = total_cap
+        self.weight_cap = weight_cap
+        self.counts = [0, 0, 0, 0]
+        self.weight = 0
+        self.value = 0.0
+        self.items: List[Tuple[float, int, int]] = []   # (цінність, вага, індекс) у порядку вибору
+
+    def fits(self, weight: int, kind: int) -> bool:
+        return (len(self.items) < self.total_cap and self.counts[kind] < self.kind_caps[kind]
+                and self.weight + weight <= self.weight_cap)
+
+    def count(self, value: float, weight: int, kind: int, sign: int = 1) -> None:
+        self.counts[kind] += sign
+        self.weight += sign * weight
+        self.value += sign * value
+
+    def add(self, value: float, weight: int, kind: int, idx: int) -> None:
+        self.count(value, weight, kind)
+        self.items.append((value, weight, idx))
+
+
+def _greedy(items, order, kind_caps, total_cap, weight_cap, deadline: float) -> _Selection:
+    sel = _Selection(kind_caps, total_cap, weight_cap)
+    for step, idx in enumerate(order):
+        if len(sel.items) >= total_cap:
+            break
+        if step % 1024 == 0 and time.perf_counter() > deadline:
+            break
+        value, weight, kind, _ = items[idx]
+        if sel.fits(weight, kind):
+            sel.add(value, weight, kind, idx)
+    return sel
+
+
+def _improve(sel: _Selection, items, order, deadline: float, candidates: int = 32) -> None:
+    """Локальний пошук: заміна найдешевших вибраних контейнерів на дорожчі невибрані."""
+    heap = sel.items   # купа за цінністю: найдешевший вибраний контейнер – heap[0]
+    heapify(heap)
+    chosen = {idx for _, _, idx in heap}
+    for step, idx in enumerate(order):
+        if step % 256 == 0 and time.perf_counter() > deadline:
+            return
+        if idx in chosen:
+            continue
+        value, weight, kind, _ = items[idx]
+        if sel.fits(weight, kind):
+            sel.count(value, weight, kind)
+            heappush(heap, (value, weight, idx))
+            chosen.add(idx)
+            continue
+        # Переглядаємо до candidates найдешевших; невідповідні повертаємо в купу
+        skipped = []
+        while heap and len(skipped) < candidates:
+            old_value, old_weight, old_idx = heap[0]
+            if old_value >= value:
+                break
+            old = heappop(heap)
+            old_kind = items[old_idx][2]
+            if (sel.weight - old_weight + weight > sel.weight_cap
+                    or (old_kind != kind and sel.counts[kind] >= sel.kind_caps[kind])):
+                skipped.append(old)
+                continue
+            sel.count(old_value, old_weight, old_kind, -1)
+            chosen.discard(old_idx)
+            sel.count(value, weight, kind)
+            heappush(heap, (value, weight, idx))
+            chosen.add(idx)
+            break
+        for old in skipped:
+            heappush(heap, old)
+
+
+def _dp(items, kind_caps, total_cap, weight_cap, deadline) -> Optional[_Selection]:
+    """
+    Обмежене DP 0/1-рюкзака за вагою (ліміти кількостей виправляються після).
+    Вага ділиться на спільний дільник або, якщо таблиця завелика, округлюється вгору до кроку,
+    тому знайдений набір завжди вміщується. Повертає None, якщо DP не вкладається в бюджет.
+    """
+    n = len(items)
+    steps = min(_DP_CELLS // n, 10_000)
+    if np is None or steps < _DP_MIN_STEPS:
+        return None
+    step = reduce(math.gcd, (w for _, w, _, _ in items), weight_cap) or 1
+    if weight_cap // step > steps:
+        step = -(-weight_cap // steps)
+    cap = weight_cap // step
+    sizes = [-(-w // step) for _, w, _, _ in items]
+    best = np.zeros(cap + 1)
+    take = np.zeros((n, cap + 1), dtype=bool)
+    for i, (value, _, _, _) in enumerate(items):
+        size = sizes[i]
+        if size > cap:
+            continue
+        candidate = best[:cap + 1 - size] + value
+        better = candidate > best[size:]
+        take[i, size:] = better
+        best[size:] = np.where(better, candidate, best[size:])
+        if i % 64 == 0 and time.perf_counter() > deadline:
+            return None
+    j = int(np.argmax(best))
+    picked = []
+    for i in range(n - 1, -1, -1):
+        if take[i, j]:
+            picked.append(i)
+            j -= sizes[i]
+
+    # Відновлюємо ліміти кількостей: спочатку беремо найцінніші контейнери
+    sel = _Selection(kind_caps, total_cap, weight_cap)
+    picked.sort(key=lambda i: -items[i][0])
+    for i in picked:
+        value, weight, kind, _ = items[i]
+        if sel.fits(weight, kind):
+            sel.add(value, weight, kind, i)
+    return sel
+
+
+def plan_load(ship, containers: Iterable[Container], value: Optional[ValueFn] = None,
+              time_budget: float = 0.5) -> List[Container]:
+    """
+    Підбирає набір контейнерів, що максимізує сумарну вагу (або value(c)),
+    не порушуючи totalWeightCapacity, загального ліміту та лімітів важких, холодильних і рідких.
+    Кандидати: обмежене DP за вагою (якщо таблиця невелика і є numpy) та два жадібні
+    проходи (за питомою цінністю і за цінністю); найкращий з них покращується локальним
+    пошуком із заміною, поки не вичерпано time_budget секунд.
+    Повертає контейнери в порядку, в якому їх треба завантажувати.
+    """
+    deadline = time.perf_counter() + time_budget
+    kind_caps, total_cap, weight_cap = _limits(ship)
+    items = []
+    for c in containers:
+        v = c.weight if value is None else value(c)
+        if v > 0 and c.weight <= weight_cap and kind_caps[c.KIND] > 0:
+            items.append((v, c.weight, c.KIND, c))
+    if not items or total_cap <= 0:
+        return []
+
+    by_value = sorted(range(len(items)), key=lambda i: -items[i][0])
+    by_density = sorted(range(len(items)), key=lambda i: -(items[i][0] / items[i][1] if items[i][1] else math.inf))
+    candidates = [_greedy(items, order, kind_caps, total_cap, weight_cap, deadline) for order in (by_density, by_value)]
+    exact = _dp(items, kind_caps, total_cap, weight_cap, deadline)
+    if exact is not None:
+        candidates.append(exact)
+    best = max(candidates, key=lambda s: s.value)
+    _improve(best, items, by_value, deadline)
+
+    chosen = [items[idx][3] for _, _, idx in best.items]
+    chosen.sort(key=lambda c: _APPLY_ORDER[c.KIND])
+    return chosen
+
+
+def load_best(sim, ship_id: int, value: Optional[ValueFn] = None,
+              time_budget: float = 0.5) -> Tuple[List[int], List[int]]:
+    """Планує завантаження корабля з його поточного порту і застосовує план через Simulation.load_many."""
+    ship = sim.ships[ship_id]
+    if ship.currentPort is None:
+        return [], []
+    plan = plan_load(ship, ship.currentPort.containers, value, time_budget)
+    return sim.load_many(ship_id, [c.ID for c in plan])
+
+
+def distribute(sim, port_id: int, ship_ids: Optional[Iterable[int]] = None,
+               value: Optional[ValueFn] = None, time_budget: float = 0.5) -> Dict[int, Tuple[List[int], List[int]]]:
+    """
+    Розподіляє контейнери порту між кількома кораблями в ньому (режим пакування в кілька контейнерів).
+    Кораблі з більшою вільною вантажопідйомністю заповнюються першими, time_budget ділиться між ними.
+    """
+    port = sim.ports[port_id]
+    ships = [sim.ships[sid] for sid in ship_ids] if ship_ids is not None else list(port.current)
+    ships = [s for s in ships if s.currentPort is port]
+    ships.sort(key=lambda s: s.specs.totalWeightCapacity - s._weight_sum, reverse=True)
+    results = {}
+    for i, ship in enumerate(ships):
+        budget = time_budget / (len(ships) - i)
+        start = time.perf_counter()
+        results[ship.ID] = load_best(sim, ship.ID, value, budget)
+        time_budget -= time.perf_counter() - start
+    return results
@@ -1,15 +1,36 @@
-from lab2.containers import BasicContainer, HeavyContainer, RefrigeratedContainer, LiquidContainer
+import sys
+from lab2.containers import make_container
 from lab2.specs import ShipSpecs
 from lab2.port import Port
 from lab2.ship import Ship
+from lab2.registry import ContainerRegistry
+from lab2.distances import DistanceMatrix, MAX_CACHED_PORTS, np as distances_np
+from lab2.export import export_state
+from lab2.ledger import TrafficLedger
+from lab2.spatial import SpatialIndex
+from lab2.metrics import (Metrics, REJECT_UNKNOWN_SHIP, REJECT_UNKNOWN_CONTAINER, REJECT_UNKNOWN_PORT,
+                          REJECT_NOT_AT_SEA, REJECT_WRONG_DESTINATION)
 
 # Простий менеджер симуляції – зберігає всі порти, кораблі та контейнери
 class Simulation:
-    def __init__(self):
+    def __init__(self, columnar=False, distance_cache=True, ledger_max_records=None,
+                 distance_cache_max_ports=MAX_CACHED_PORTS):
         self.ports = {}         # словник усіх портів {ID: Port}
         self.ships = {}         # словник усіх кораблів {ID: Ship}
         self.containers = {}    # словник усіх контейнерів {ID: Container}
         self._next_container_id = 0  # для автоматичної генерації унікальних ID контейнерів
+        # Необов'язковий колонковий реєстр (NumPy) для аналітики по всьому флоту
+        self.registry = ContainerRegistry() if columnar else None
+        # Кеш відстаней між усіма портами (потрібен numpy; займає N^2 * 8 байт).
+        # Після distance_cache_max_ports портів кеш вимикається – далі відстані рахуються скалярно
+        self.distance_matrix = (DistanceMatrix(max_ports=distance_cache_max_ports)
+                                if distance_cache and distances_np is not None else None)
+        # Просторовий індекс портів для запитів "найближчі" / "в радіусі" (lab2/spatial.py)
+        self.spatial = SpatialIndex()
+        # Журнал заходів кораблів у порти (lab2/ledger.py)
+        self.ledger = TrafficLedger(max_records=ledger_max_records)
+        # Метрики операцій (lab2/metrics.py); None – вимкнені й нічого не коштують
+        self.metrics = None
 
     def _next_id(self):
         # Генерує наступний унікальний ID контейнера
@@ -21,7 +42,50 @@ class Simulation:
         # Створює новий порт, якщо такого ще немає
         if ID in self.ports:
             raise ValueError("Port exists")
-        self.ports[ID] = Port(ID, lat, lon)
+        port = Port(ID, lat, lon)
+        port._ledger = self.ledger
+        self.spatial.add(port.ID, port.latitude, port.longitude)
+        if self.distance_matrix is not None and self.distance_matrix.full:
+            self._drop_distance_cache()
+        if self.distance_matrix is not None:
+            # Рахуємо лише новий рядок і стовпець матриці
+            self.distance_matrix.add_port(port.ID, port.latitude, port.longitude)
+            port._distances = self.distance_matrix
+        self.ports[ID] = port
+
+    def _drop_distance_cache(self):
+        # Кеш досяг межі: звільняємо матрицю, порти знову рахують відстані гаверсином
+        for port in self.ports.values():
+            port._distances = None
+        self.distance_matrix = None
+
+    def distances(self, from_ids, to_ids):
+        # Відстані між наборами портів: матриця numpy з кешу або список списків без нього
+        if self.distance_matrix is not None:
+            return self.distance_matrix.distances(from_ids, to_ids)
+        targets = [self.ports[pid] for pid in to_ids]
+        return [[self.ports[pid].getDistance(t) for t in targets] for pid in from_ids]
+
+    def nearest_ports(self, lat, lon, k=1):
+        # k найближчих портів до точки: список (ID порту, км)
+        return self.spatial.nearest(lat, lon, k)
+
+    def within_radius(self, port_id, km):
+        # Інші порти не далі km від порту: список (ID порту, км)
+        if port_id not in self.ports:
+            raise ValueError("Port not found")
+        return self.spatial.within_radius(port_id, km)
+
+    def reachable(self, ship_id):
+        # Порти, куди корабель дійде без дозаправки з поточним вантажем і паливом
+        ship = self.ships.get(ship_id)
+        if ship is None:
+            raise ValueError("Ship not found")
+        if ship.currentPort is None:
+            return []
+        rate = ship.fuel_per_km()
+        max_km = ship.fuel / rate if rate > 0 else float("inf")
+        return self.spatial.within_radius(ship.currentPort.ID, max_km)
 
     def create_ship(self, ID, port_id, specs: ShipSpecs, fuel=0.0):
         # Створює новий корабель у вказаному порту
@@ -36,14 +100,10 @@ class Simulation:
     def create_container(self, weight, kind=None):
         # Створює контейнер з автоматичним ID і типом
         cid = self._next_id()
-        if kind == "R":
-            cont = RefrigeratedContainer(cid, weight)
-        elif kind == "L":
-            cont = LiquidContainer(cid, weight)
-        else:
-            # Визначає базовий чи важкий контейнер залежно від ваги
-            cont = BasicContainer(cid, weight) if weight <= 3000 else HeavyContainer(cid, weight)
+        cont = make_container(cid, weight, kind)
         self.containers[cid] = cont
+        if self.registry is not None:
+            self.registry.add(cid, cont.weight, cont.KIND)
         return cid
 
     def place_container_in_port(self, cid, port_id):
@@ -53,61 +113,193 @@ class Simulation:
         if cont is None or port is None:
             raise ValueError("Container or port not found")
         port.containers.append(cont)
+        if self.registry is not None:
+            self.registry.set_port(cid, port_id)
 
     def load(self, ship_id, container_id):
         # Завантажує контейнер на корабель
+        if self.metrics is not None:
+            return self.metrics.observe("load", self._load, ship_id, container_id)
+        return self._load(ship_id, container_id) is None
+
+    def _load(self, ship_id, container_id):
+        # Повертає причину відмови (коди в lab2/metrics.py) або None
         ship = self.ships.get(ship_id)
+        if ship is None:
+            return REJECT_UNKNOWN_SHIP
         cont = self.containers.get(container_id)
-        if ship is None or cont is None:
-            return False
-        return ship.load(cont)
+        if cont is None:
+            return REJECT_UNKNOWN_CONTAINER
+        reason = ship.try_load(cont)
+        if reason is None and self.registry is not None:
+            self.registry.set_ship(container_id, ship_id)
+        return reason
+
+    def load_many(self, ship_id, container_ids):
+        # Пакетне завантаження: повертає (прийняті ID, відхилені ID).
+        # Невідомі ID контейнерів додаються в кінець списку відхилених.
+        if self.metrics is not None:
+            return self.metrics.observe_batch("load_many", self._load_many, ship_id, container_ids)
+        return self._load_many(ship_id, container_ids, None)
+
+    def _load_many(self, ship_id, container_ids, reasons):
+        ship = self.ships.get(ship_id)
+        if ship is None:
+            rejected = list(container_ids)
+            if reasons is not None and rejected:
+                reasons[REJECT_UNKNOWN_SHIP] = len(rejected)
+            return [], rejected
+        conts, unknown = [], []
+        for cid in container_ids:
+            cont = self.containers.get(cid)
+            if cont is None:
+                unknown.append(cid)
+            else:
+                conts.append(cont)
+        accepted, rejected = ship.load_many(conts, reasons)
+        rejected.extend(unknown)
+        if unknown and reasons is not None:
+            reasons[REJECT_UNKNOWN_CONTAINER] = reasons.get(REJECT_UNKNOWN_CONTAINER, 0) + len(unknown)
+        if accepted and self.registry is not None:
+            self.registry.set_ship_many(accepted, ship_id)
+        return accepted, rejected
 
     def unload(self, ship_id, container_id):
         # Розвантажує контейнер з корабля в поточний порт
+        if self.metrics is not None:
+            return self.metrics.observe("unload", self._unload, ship_id, container_id)
+        return self._unload(ship_id, container_id) is None
+
+    def _unload(self, ship_id, container_id):
         ship = self.ships.get(ship_id)
+        if ship is None:
+            return REJECT_UNKNOWN_SHIP
         cont = self.containers.get(container_id)
-        if ship is None or cont is None:
-            return False
-        return ship.unLoad(cont)
+        if cont is None:
+            return REJECT_UNKNOWN_CONTAINER
+        reason = ship.try_unLoad(cont)
+        if reason is None and self.registry is not None:
+            self.registry.set_port(container_id, ship.currentPort.ID)
+        return reason
 
     def refuel(self, ship_id, amount):
         # Дозаправка корабля
+        if self.metrics is not None:
+            return self.metrics.observe("refuel", self._refuel, ship_id, amount)
+        return self._refuel(ship_id, amount) is None
+
+    def _refuel(self, ship_id, amount):
         ship = self.ships.get(ship_id)
         if ship is None:
-            return False
+            return REJECT_UNKNOWN_SHIP
         ship.reFuel(amount)
-        return True
+        return None
 
     def sail(self, ship_id, dest_port_id):
         # Переміщення корабля між портами
+        if self.metrics is not None:
+            return self.metrics.observe("sail", self._sail, ship_id, dest_port_id)
+        return self._sail(ship_id, dest_port_id) is None
+
+    def _sail(self, ship_id, dest_port_id):
+        ship = self.ships.get(ship_id)
+        if ship is None:
+            return REJECT_UNKNOWN_SHIP
+        dest = self.ports.get(dest_port_id)
+        if dest is None:
+            return REJECT_UNKNOWN_PORT
+        reason = ship.try_depart(dest)
+        if reason is None:
+            self._arrive(ship, dest)
+        return reason
+
+    def depart(self, ship_id, dest_port_id):
+        # Відправлення в рейс без прибуття (для симуляції з часом, див. lab2/events.py)
+        if self.metrics is not None:
+            return self.metrics.observe("depart", self._depart, ship_id, dest_port_id)
+        return self._depart(ship_id, dest_port_id) is None
+
+    def _depart(self, ship_id, dest_port_id):
+        ship = self.ships.get(ship_id)
+        if ship is None:
+            return REJECT_UNKNOWN_SHIP
+        dest = self.ports.get(dest_port_id)
+        if dest is None:
+            return REJECT_UNKNOWN_PORT
+        return ship.try_depart(dest)
+
+    def arrive(self, ship_id, dest_port_id):
+        # Прибуття корабля, який раніше вийшов у рейс через depart
+        if self.metrics is not None:
+            return self.metrics.observe("arrive", self._arrive_checked, ship_id, dest_port_id)
+        return self._arrive_checked(ship_id, dest_port_id) is None
+
+    def _arrive_checked(self, ship_id, dest_port_id):
+        ship = self.ships.get(ship_id)
+        if ship is None:
+            return REJECT_UNKNOWN_SHIP
+        dest = self.ports.get(dest_port_id)
+        if dest is None:
+            return REJECT_UNKNOWN_PORT
+        if ship.currentPort is not None:
+            return REJECT_NOT_AT_SEA
+        # Паливо списане за перехід до ship.destination; None – корабель створено в морі без рейсу
+        if ship.destination is not None and ship.destination is not dest:
+            return REJECT_WRONG_DESTINATION
+        self._arrive(ship, dest)
+        return None
+
+    def estimate_fuel(self, ship_id, dest_port_id):
+        # Паливо на перехід корабля до порту з поточним вантажем – O(1), для планувальників
         ship = self.ships.get(ship_id)
         dest = self.ports.get(dest_port_id)
         if ship is None or dest is None:
-            return False
-        return ship.sailTo(dest)
+            raise ValueError("Ship or port not found")
+        return ship.estimate_fuel(dest)
 
-    # Друкує стан усіх портів і кораблів у текстовому вигляді
+    def _arrive(self, ship, dest):
+        if self.registry is None:
+            ship.arrive(dest)
+            return
+        # Прибуття вивантажує весь вантаж у порт призначення – переносимо його і в реєстрі
+        cargo = [c.ID for c in ship._containers]
+        ship.arrive(dest)
+        if cargo:
+            self.registry.set_port_many(cargo, dest.ID)
+
+    def enable_metrics(self, hook=None):
+        # Вмикає лічильники, гістограми затримок і відмови за причинами; hook викликається на кожну операцію
+        if self.metrics is None:
+            self.metrics = Metrics(hook)
+        else:
+            self.metrics.hook = hook
+        return self.metrics
+
+    def disable_metrics(self):
+        self.metrics = None
+
+    def metrics_snapshot(self):
+        # Поточні метрики як словник (порожній, якщо метрики вимкнені)
+        return self.metrics.snapshot() if self.metrics is not None else {}
+
+    def save(self, path):
+        # Зберігає стан у компактний двійковий знімок (див. lab2/snapshot.py)
+        from lab2.snapshot import save
+        save(self, path)
+
+    @classmethod
+    def restore(cls, path, lazy=False, **kwargs):
+        # Відновлює симуляцію зі знімка; lazy=True створює контейнери лише при першому зверненні
+        from lab2.snapshot import restore
+        return restore(path, lazy=lazy, **kwargs)
+
+    # Друкує стан усіх портів і кораблів у текстовому вигляді (один буферизований запис)
     def print_state(self):
-        for pid in sorted(self.ports.keys()):
-            p = self.ports[pid]
-            print(f"Port {p.ID}: lat={p.latitude:.2f}, lon={p.longitude:.2f}")
-            types = p.containers_by_type()
-            print("  Containers at port:")
-            print(f"    basic: {types['basic_container']}")
-            print(f"    heavy: {types['heavy_container']}")
-            print(f"    refrigerated: {types['refrigerated_container']}")
-            print(f"    liquid: {types['liquid_container']}")
-            if p.current:
-                print("  Ships in port:")
-                for s in sorted(p.current, key=lambda x: x.ID):
-                    print(f"    Ship {s.ID}: fuel_left={s.fuel:.2f}")
-                    sc = s.containers_by_type()
-                    print(f"      basic: {sc['basic_container']}")
-                    print(f"      heavy: {sc['heavy_container']}")
-                    print(f"      refrigerated: {sc['refrigerated_container']}")
-                    print(f"      liquid: {sc['liquid_container']}")
-            else:
-                print("  (no ships)")
+        export_state(self, sys.stdout, fmt="text", mark=False)
+
+    def export_state(self, out, fmt="jsonl", delta=False):
+        # Структурований експорт стану; delta=True – лише змінені порти й кораблі (див. lab2/export.py)
+        return export_state(self, out, fmt=fmt, delta=delta)
 
 if __name__ == "__main__":
     sim = Simulation()
@@ -137,29 +329,27 @@ if __name__ == "__main__":
         maxNumberOfLiquidContainers=2,
         fuelConsumptionPerKM=0.5
     )
-    sim.create_ship(0, 0, specs, fuel=10000.0)
-
-# Завантажуємо ВСІ контейнери з порту 0
-for cont in list(sim.ports[0].containers):  # робимо копію списку, бо він змінюється
-    print(f"Load {cont.ID} ->", sim.load(0, cont.ID))
-
-# Перевіряємо "неіснуючий" контейнер
-print("Load non-existent ->", sim.load(0, 999))  # False
+    sim.create_ship(0, 0, specs, fuel=25000.0)
 
+    # Завантажуємо ВСІ контейнери з порту 0 одним пакетом
+    accepted, rejected = sim.load_many(0, [cont.ID for cont in sim.ports[0].containers])
+    print("Loaded:", accepted, "rejected:", rejected)
 
-# 🚢 Показати стан після завантаження (корабель у порту 0 з контейнерами)
-print("\n--- State after loading ---")
-sim.print_state()
+    # Перевіряємо "неіснуючий" контейнер
+    print("Load non-existent ->", sim.load(0, 999))  # False
 
-# Дозаправка корабля
-sim.refuel(0, 200.0)
 
-# Корабель пливе в порт 1
-ok = sim.sail(0, 1)
-print("Sail to port 1 successful?", ok)
+    # 🚢 Показати стан після завантаження (корабель у порту 0 з контейнерами)
+    print("\n--- State after loading ---")
+    sim.print_state()
 
-# 🚢 Показати стан після відплиття
-print("\n--- Final state ---")
-sim.print_state()
+    # Дозаправка корабля
+    sim.refuel(0, 200.0)
 
+    # Корабель пливе в порт 1
+    ok = sim.sail(0, 1)
+    print("Sail to port 1 successful?", ok)
 
+    # 🚢 Показати стан після відплиття
+    print("\n--- Final state ---")
+    sim.print_state()
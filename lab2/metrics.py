@@ -0,0 +1,135 @@
+from __future__ import annotations
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Коди причин відмови операцій (load, load_many, unload, sail, depart, arrive, refuel)
+REJECT_UNKNOWN_SHIP = "unknown_ship"
+REJECT_UNKNOWN_CONTAINER = "unknown_container"
+REJECT_UNKNOWN_PORT = "unknown_port"
+REJECT_AT_SEA = "at_sea"                    # корабель у морі, а операція потребує порту
+REJECT_NOT_AT_SEA = "not_at_sea"            # arrive для корабля, що стоїть у порту
+REJECT_WRONG_DESTINATION = "wrong_destination"   # arrive не в той порт, куди корабель вийшов
+REJECT_WRONG_PORT = "wrong_port"            # контейнера немає в порту корабля
+REJECT_NOT_ON_BOARD = "not_on_board"        # контейнера немає на кораблі
+REJECT_WEIGHT = "weight_limit"
+REJECT_TOTAL = "total_limit"
+REJECT_HEAVY = "heavy_limit"
+REJECT_REFRIGERATED = "refrigerated_limit"
+REJECT_LIQUID = "liquid_limit"
+REJECT_NO_FUEL = "no_fuel"
+
+BUCKETS = 64   # гістограма затримок: кошик k рахує виклики тривалістю < 2^k нс
+
+# hook(операція, аргументи, причина відмови або словник причин для пакетних операцій, секунди)
+Hook = Callable[[str, tuple, Any, float], None]
+
+
+class Metrics:
+    """
+    Лічильники викликів, логарифмічні гістограми затримок і відмови за причинами для кожної операції.
+    Simulation звертається сюди лише коли метрики увімкнені (Simulation.enable_metrics),
+    тож без них гарячі шляхи не платять за вимірювання.
+    """
+
+    def __init__(self, hook: Optional[Hook] = None) -> None:
+        self.hook = hook
+        self.calls: Dict[str, int] = {}
+        self.rejections: Dict[str, Dict[str, int]] = {}
+        self.latency: Dict[str, List[int]] = {}
+        self.latency_ns: Dict[str, int] = {}
+
+    def _record(self, op: str, elapsed_ns: int) -> None:
+        hist = self.latency.get(op)
+        if hist is None:
+            hist = self.latency[op] = [0] * BUCKETS
+            self.calls[op] = 0
+            self.latency_ns[op] = 0
+            self.rejections[op] = {}
+        self.calls[op] += 1
+        self.latency_ns[op] += elapsed_ns
+        hist[min(elapsed_ns.bit_length(), BUCKETS - 1)] += 1
+
+    def _reject(self, op: str, reason: str, count: int = 1) -> None:
+        counts = self.rejections[op]
+        counts[reason] = counts.get(reason, 0) + count
+
+    def observe(self, op: str, fn: Callable[..., Optional[str]], *args) -> bool:
+        """Викликає fn(*args), що повертає причину відмови або None; повертає True при успіху."""
+        start = time.perf_counter_ns()
+        try:
+            reason = fn(*args)
+        except Exception as e:
+            self._record(op, time.perf_counter_ns() - start)
+            self._reject(op, "error_" + type(e).__name__)
+            raise
+        elapsed = time.perf_counter_ns() - start
+        self._record(op, elapsed)
+        if reason is not None:
+            self._reject(op, reason)
+        if self.hook is not None:
+            self.hook(op, args, reason, elapsed / 1e9)
+        return reason is None
+
+    def observe_batch(self, op: str, fn: Callable[..., Any], *args) -> Any:
+        """Для пакетних операцій: fn(*args, reasons) сама рахує відмови у словнику reasons."""
+        reasons: Dict[str, int] = {}
+        start = time.perf_counter_ns()
+        try:
+            result = fn(*args, reasons)
+        except Exception as e:
+            self._record(op, time.perf_counter_ns() - start)
+            self._reject(op, "error_" + type(e).__name__)
+            raise
+        elapsed = time.perf_counter_ns() - start
+        self._record(op, elapsed)
+        for reason, count in reasons.items():
+            self._reject(op, reason, count)
+        if self.hook is not None:
+            self.hook(op, args, reasons, elapsed / 1e9)
+        return result
+
+    def reset(self) -> None:
+        self.calls.clear()
+        self.rejections.clear()
+        self.latency.clear()
+        self.latency_ns.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        {операція: {"calls", "rejections": {причина: к-сть}, "latency_sum_seconds",
+        "latency_buckets": {верхня межа в секундах: к-сть}}} – лише непорожні кошики.
+        """
+        return {
+            op: {
+                "calls": self.calls[op],
+                "rejections": dict(self.rejections[op]),
+                "latency_sum_seconds": self.latency_ns[op] / 1e9,
+                "latency_buckets": {(1 << k) / 1e9: n for k, n in enumerate(hist) if n},
+            }
+            for op, hist in self.latency.items()
+        }
+
+    def to_prometheus(self, prefix: str = "lab2") -> str:
+        """Текстовий формат експозиції Prometheus: лічильники викликів і відмов, гістограма затримок."""
+        lines = [f"# HELP {prefix}_calls_total Simulation operation calls.",
+                 f"# TYPE {prefix}_calls_total counter"]
+        for op in sorted(self.calls):
+            lines.append(f'{prefix}_calls_total{{op="{op}"}} {self.calls[op]}')
+        lines += [f"# HELP {prefix}_rejections_total Rejected operations by reason.",
+                  f"# TYPE {prefix}_rejections_total counter"]
+        for op in sorted(self.rejections):
+            for reason, count in sorted(self.rejections[op].items()):
+                lines.append(f'{prefix}_rejections_total{{op="{op}",reason="{reason}"}} {count}')
+        name = f"{prefix}_latency_seconds"
+        lines += [f"# HELP {name} Simulation operation latency.", f"# TYPE {name} histogram"]
+        for op in sorted(self.latency):
+            hist = self.latency[op]
+            top = max((k for k, n in enumerate(hist) if n), default=0)
+            total = 0
+            for k in range(top + 1):
+                total += hist[k]
+                lines.append(f'{name}_bucket{{op="{op}",le="{(1 << k) / 1e9:.9g}"}} {total}')
+            lines.append(f'{name}_bucket{{op="{op}",le="+Inf"}} {self.calls[op]}')
+            lines.append(f'{name}_sum{{op="{op}"}} {self.latency_ns[op] / 1e9:.9g}')
+            lines.append(f'{name}_count{{op="{op}"}} {self.calls[op]}')
+        return "\n".join(lines) + "\n"
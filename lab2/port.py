@@ -1,32 +1,51 @@
 from __future__ import annotations
 import math
-from typing import List, Dict
-from lab2.containers import Container, BasicContainer, HeavyContainer, RefrigeratedContainer, LiquidContainer
+from typing import Dict
+from lab2.containers import TYPE_KEYS
+from lab2.storage import ContainerStore
 
 class Port:
+    __slots__ = ("ID", "latitude", "longitude", "containers", "current", "_seen", "_ledger", "_distances", "_dirty")
+
     def __init__(self, ID: int, latitude: float, longitude: float):
         self.ID = int(ID)                     # Унікальний ідентифікатор порту
         self.latitude = float(latitude)       # Географічна широта
         self.longitude = float(longitude)     # Географічна довгота
-        self.containers: List[Container] = [] # Контейнери, що знаходяться у порту
-        self.history = []                     # Список кораблів, що коли-небудь відвідували порт
-        self.current = []                     # Кораблі, що зараз у порту
+        self.containers = ContainerStore()    # Контейнери, що знаходяться у порту (з індексом за ID і типом)
+        self.current: Dict = {}               # Кораблі, що зараз у порту ({Ship: None}: порядок заходу, O(1) перевірка)
+        self._seen: Dict = {}                 # Кораблі, що коли-небудь відвідували порт (у порядку першого заходу)
+        self._ledger = None                   # Спільний журнал візитів (TrafficLedger), якщо його веде Simulation
+        self._distances = None                # Спільний кеш відстаней (DistanceMatrix), якщо його веде Simulation
+        self._dirty = True                    # Кораблі в порту змінилися з часу останнього експорту
+
+    @property
+    def history(self) -> list:
+        """Список кораблів, що коли-небудь відвідували порт."""
+        return list(self._seen)
 
     def incomingShip(self, ship) -> None:
-        """Додає корабель до поточного списку та історії (якщо його там ще немає)."""
+        """Додає корабель до поточних та в історію (якщо його там ще немає)."""
         if ship not in self.current:
-            self.current.append(ship)
-        if ship not in self.history:
-            self.history.append(ship)
+            self.current[ship] = None
+            self._dirty = True
+            if self._ledger is not None:
+                self._ledger.arrive(ship.ID, self.ID)
+        self._seen.setdefault(ship)
 
     def outgoingShip(self, ship) -> None:
-        """Видаляє корабель з поточного списку та додає його в історію (якщо раніше не був там)."""
+        """Видаляє корабель з поточних та додає його в історію (якщо раніше не був там)."""
         if ship in self.current:
-            self.current.remove(ship)
-        if ship not in self.history:
-            self.history.append(ship)
+            del self.current[ship]
+            self._dirty = True
+            if self._ledger is not None:
+                self._ledger.depart(ship.ID, self.ID)
+        self._seen.setdefault(ship)
 
     def getDistance(self, other: "Port") -> float:
+        # Якщо обидва порти зареєстровані в одному кеші – беремо готову відстань
+        cache = self._distances
+        if cache is not None and other._distances is cache:
+            return cache.get(self.ID, other.ID)
         # формула гаверсина
         R = 6371  # радіус Землі в км
         lat1, lon1 = math.radians(self.latitude), math.radians(self.longitude)
@@ -39,24 +58,16 @@ class Port:
 
     def containers_by_type(self) -> Dict[str, list]:
         """Повертає словник зі списками ID контейнерів, відсортованих за типом."""
-        types = {
-            "basic_container": [],
-            "heavy_container": [],
-            "refrigerated_container": [],
-            "liquid_container": []
-        }
-        for c in self.containers:
-            if isinstance(c, BasicContainer):
-                types["basic_container"].append(c.ID)
-            elif isinstance(c, RefrigeratedContainer):
-                types["refrigerated_container"].append(c.ID)
-            elif isinstance(c, LiquidContainer):
-                types["liquid_container"].append(c.ID)
-            elif isinstance(c, HeavyContainer):
-                types["heavy_container"].append(c.ID)
-        for k in types:
-            types[k].sort()
-        return types
+        # Кошики за типом ведуться сховищем, повного проходу по контейнерах немає
+        return {k: list(self.containers.sorted_ids(k)) for k in TYPE_KEYS}
+
+    def is_dirty(self) -> bool:
+        """Чи змінився порт (кораблі або контейнери) з часу останнього експорту."""
+        return self._dirty or self.containers.dirty
+
+    def mark_clean(self) -> None:
+        self._dirty = False
+        self.containers.dirty = False
 
     def __repr__(self) -> str:
         return f"Port(ID={self.ID}, lat={self.latitude}, lon={self.longitude})"
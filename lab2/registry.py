@@ -0,0 +1,134 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional
+from lab2.containers import CONSUMPTION_SCALE, KIND_CLASSES, TYPE_KEYS
+
+try:
+    import numpy as np
+except ImportError:  # numpy – необов'язкова залежність, потрібна лише для колонкового реєстру
+    np = None
+
+NO_LOCATION = -1  # контейнер не знаходиться ні в порту, ні на кораблі
+
+
+class ContainerRegistry:
+    """
+    Колонковий реєстр контейнерів на масивах NumPy.
+    Кожен контейнер – це рядок у масивах ID, ваги, коду типу (KIND) та розташування
+    (порт або корабель). Агрегати по всьому флоту рахуються одним векторним проходом.
+    Об'єкти Container залишаються легкими представленнями: вага незмінна,
+    а рядок реєстру знаходиться за ID контейнера.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        if np is None:
+            raise ImportError("numpy is required for ContainerRegistry")
+        capacity = max(int(capacity), 1)
+        self._n = 0
+        self._rows: Dict[int, int] = {}   # ID контейнера -> номер рядка
+        self.ids = np.empty(capacity, dtype=np.int64)
+        self.weight = np.empty(capacity, dtype=np.int64)
+        self.kind = np.empty(capacity, dtype=np.int8)
+        self.port = np.empty(capacity, dtype=np.int64)   # ID порту або NO_LOCATION
+        self.ship = np.empty(capacity, dtype=np.int64)   # ID корабля або NO_LOCATION
+        # Коефіцієнти витрати палива за кодом типу, вже помножені на масштаб
+        self._rates = np.array([cls.RATE for cls in KIND_CLASSES]) * CONSUMPTION_SCALE
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _grow(self) -> None:
+        # Подвоюємо ємність – амортизовано O(1) на додавання
+        capacity = len(self.ids) * 2
+        for name in ("ids", "weight", "kind", "port", "ship"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._n] = old[:self._n]
+            setattr(self, name, new)
+
+    def add(self, cid: int, weight: int, kind: int) -> int:
+        """Додає контейнер і повертає номер його рядка."""
+        if cid in self._rows:
+            raise ValueError(f"Container {cid} already registered")
+        if self._n == len(self.ids):
+            self._grow()
+        row = self._n
+        self.ids[row] = cid
+        self.weight[row] = weight
+        self.kind[row] = kind
+        self.port[row] = NO_LOCATION
+        self.ship[row] = NO_LOCATION
+        self._rows[cid] = row
+        self._n += 1
+        return row
+
+    def row(self, cid: int) -> int:
+        return self._rows[cid]
+
+    def set_port(self, cid: int, port_id: int) -> None:
+        row = self._rows[cid]
+        self.port[row] = port_id
+        self.ship[row] = NO_LOCATION
+
+    def set_ship(self, cid: int, ship_id: int) -> None:
+        row = self._rows[cid]
+        self.ship[row] = ship_id
+        self.port[row] = NO_LOCATION
+
+    def _row_array(self, cids: Iterable[int]):
+        rows = self._rows
+        return np.fromiter((rows[cid] for cid in cids), dtype=np.int64)
+
+    def set_port_many(self, cids: Iterable[int], port_id: int) -> None:
+        rows = self._row_array(cids)
+        self.port[rows] = port_id
+        self.ship[rows] = NO_LOCATION
+
+    def set_ship_many(self, cids: Iterable[int], ship_id: int) -> None:
+        rows = self._row_array(cids)
+        self.ship[rows] = ship_id
+        self.port[rows] = NO_LOCATION
+
+    def consumption(self):
+        """Масив витрати палива на 1 км для кожного рядка (weight * RATE * CONSUMPTION_SCALE)."""
+        n = self._n
+        return self.weight[:n] * self._rates[self.kind[:n]]
+
+    def _group_sum(self, location, values) -> Dict[int, float]:
+        loc = location[:self._n]
+        mask = loc != NO_LOCATION
+        keys, inverse = np.unique(loc[mask], return_inverse=True)
+        sums = np.bincount(inverse, weights=values[mask], minlength=len(keys))
+        return dict(zip(keys.tolist(), sums.tolist()))
+
+    def weight_by_port(self) -> Dict[int, int]:
+        return {k: int(v) for k, v in self._group_sum(self.port, self.weight[:self._n]).items()}
+
+    def weight_by_ship(self) -> Dict[int, int]:
+        return {k: int(v) for k, v in self._group_sum(self.ship, self.weight[:self._n]).items()}
+
+    def consumption_by_port(self) -> Dict[int, float]:
+        return self._group_sum(self.port, self.consumption())
+
+    def consumption_by_ship(self) -> Dict[int, float]:
+        return self._group_sum(self.ship, self.consumption())
+
+    def type_histogram(self, port_id: Optional[int] = None, ship_id: Optional[int] = None) -> Dict[str, int]:
+        """Кількість контейнерів кожного типу – загалом, у порту або на кораблі."""
+        kind = self.kind[:self._n]
+        if port_id is not None:
+            kind = kind[self.port[:self._n] == port_id]
+        elif ship_id is not None:
+            kind = kind[self.ship[:self._n] == ship_id]
+        counts = np.bincount(kind, minlength=len(TYPE_KEYS))
+        return dict(zip(TYPE_KEYS, counts.tolist()))
+
+    def heaviest(self, n: int) -> List[int]:
+        """ID n найважчих контейнерів, від найважчого до найлегшого."""
+        size = self._n
+        n = min(int(n), size)
+        if n <= 0:
+            return []
+        weight = self.weight[:size]
+        top = np.argpartition(weight, size - n)[size - n:]
+        top = top[np.argsort(-weight[top], kind="stable")]
+        return self.ids[top].tolist()
@@ -0,0 +1,160 @@
+from __future__ import annotations
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # планувальник працює векторно і без numpy недоступний
+    np = None
+from lab2.distances import EARTH_RADIUS_KM, haversine
+
+
+@dataclass
+class Route:
+    ports: List[int]   # ID портів від початкового до кінцевого
+    distance: float    # загальна довжина маршруту в км
+    fuel: float        # паливо на весь маршрут
+
+    @property
+    def stops(self) -> List[int]:
+        """Проміжні порти, де корабель дозаправляється."""
+        return self.ports[1:-1]
+
+
+class RoutePlanner:
+    """
+    Пошук найкоротших маршрутів з дозаправками по графу портів.
+    Ребро між двома портами існує, якщо переходу вистачає одного бака палива.
+    Дерева найкоротших шляхів (Дейкстра по щільному графу) кешуються
+    для кожної пари (порт відправлення, максимальна довжина переходу), тому повторні
+    запити з того самого порту зводяться до відновлення шляху.
+    Рядки відстаней беруться з кешу Simulation (DistanceMatrix), а якщо його немає
+    (вимкнений або перевищив межу портів) – рахуються гаверсином для кожного рядка на льоту:
+    пам'ять O(N) замість N^2, час дерева той самий порядок O(N^2).
+    """
+
+    def __init__(self, sim, cache_size: int = 256) -> None:
+        if np is None:
+            raise ImportError("numpy is required for RoutePlanner")
+        self.sim = sim
+        self.cache_size = int(cache_size)
+        self._trees: "OrderedDict[Tuple[int, int], Tuple[List[float], List[int]]]" = OrderedDict()
+        self._ports_seen = -1
+        self._matrix = None
+        self._refresh()
+
+    def _refresh(self) -> None:
+        # Порядок портів – порядок створення (той самий, що й рядки DistanceMatrix)
+        ports = self.sim.ports
+        self._ports_seen = len(ports)
+        self._ids = list(ports)
+        self._index = {pid: i for i, pid in enumerate(self._ids)}
+        self._matrix = self.sim.distance_matrix
+        if self._matrix is None:
+            self._lat = np.radians(np.fromiter((p.latitude for p in ports.values()), dtype=float, count=len(ports)))
+            self._lon = np.radians(np.fromiter((p.longitude for p in ports.values()), dtype=float, count=len(ports)))
+
+    def _row(self, u: int):
+        # Відстані від порту в рядку u до всіх портів
+        if self._matrix is not None:
+            return self._matrix.view()[u]
+        row = haversine(self._lat[u], self._lon[u], self._lat, self._lon)
+        row[u] = 0.0
+        return row
+
+    def _tree(self, source_id: int, max_hop_km: int):
+        # Нові порти (або вимкнений кеш відстаней) змінюють граф – старі дерева стають недійсними
+        if len(self.sim.ports) != self._ports_seen or self.sim.distance_matrix is not self._matrix:
+            self._trees.clear()
+            self._refresh()
+        key = (source_id, max_hop_km)
+        tree = self._trees.get(key)
+        if tree is not None:
+            self._trees.move_to_end(key)
+            return tree
+        tree = self._dijkstra(self._index[source_id], max_hop_km)
+        self._trees[key] = tree
+        if len(self._trees) > self.cache_size:
+            self._trees.popitem(last=False)
+        return tree
+
+    def _dijkstra(self, source: int, max_hop_km: float):
+        # Дейкстра для щільного графа: O(N) векторних кроків по N елементів
+        n = len(self._ids)
+        dist = np.full(n, np.inf)
+        pred = np.full(n, -1, dtype=np.int64)
+        done = np.zeros(n, dtype=bool)
+        dist[source] = 0.0
+        for _ in range(n):
+            candidates = np.where(done, np.inf, dist)
+            u = int(np.argmin(candidates))
+            if candidates[u] == np.inf:
+                break
+            done[u] = True
+            row = self._row(u)
+            new = dist[u] + row
+            better = (row <= max_hop_km) & (new < dist) & ~done
+            dist[better] = new[better]
+            pred[better] = u
+        # Списки Python швидші за numpy для поелементного відновлення шляхів
+        return dist.tolist(), pred.tolist()
+
+    def _build(self, tree, dest_id: int, fuel_per_km: float) -> Optional[Route]:
+        dist, pred = tree
+        target = self._index[dest_id]
+        if dist[target] == math.inf:
+            return None
+        ids = self._ids
+        path = [target]
+        while pred[path[-1]] != -1:
+            path.append(pred[path[-1]])
+        path.reverse()
+        distance = dist[target]
+        return Route([ids[i] for i in path], distance, distance * fuel_per_km)
+
+    def _hop_limit(self, ship, tank: Optional[float]) -> Tuple[int, float]:
+        # Максимальна довжина переходу на одному баку (округлена вниз до км для спільного кешу)
+        rate = ship.fuel_per_km()
+        fuel = ship.fuel if tank is None else tank
+        if rate <= 0:
+            # Без витрати палива обмеження переходу немає: беремо половину кола Землі
+            return int(math.ceil(math.pi * EARTH_RADIUS_KM)), rate
+        return int(fuel / rate), rate
+
+    def route_from(self, source_id: int, dest_id: int, max_hop_km: float, fuel_per_km: float) -> Optional[Route]:
+        """Найкоротший маршрут між портами, якщо кожен перехід не довший за max_hop_km."""
+        return self._build(self._tree(source_id, int(max_hop_km)), dest_id, fuel_per_km)
+
+    def route(self, ship_id: int, dest_id: int, tank: Optional[float] = None) -> Optional[Route]:
+        """
+        Маршрут корабля з поточного порту до dest_id або None, якщо дістатися неможливо.
+        tank – скільки палива можна мати на один перехід (за замовчуванням поточне паливо корабля);
+        у кожному порту маршруту корабель дозаправляється до цього рівня.
+        """
+        ship = self.sim.ships[ship_id]
+        if ship.currentPort is None:
+            return None
+        hop, rate = self._hop_limit(ship, tank)
+        return self._build(self._tree(ship.currentPort.ID, hop), dest_id, rate)
+
+    def plan_fleet(self, queries: Iterable[Tuple[int, int]], tank: Optional[float] = None) -> List[Optional[Route]]:
+        """
+        Пакетне планування для пар (ship_id, dest_id).
+        Запити групуються за (порт відправлення, довжина переходу), тож кожне дерево рахується один раз.
+        """
+        queries = list(queries)
+        results: List[Optional[Route]] = [None] * len(queries)
+        groups: Dict[Tuple[int, int], List[Tuple[int, int, float]]] = {}
+        for i, (ship_id, dest_id) in enumerate(queries):
+            ship = self.sim.ships[ship_id]
+            if ship.currentPort is None:
+                continue
+            hop, rate = self._hop_limit(ship, tank)
+            groups.setdefault((ship.currentPort.ID, hop), []).append((i, dest_id, rate))
+        for (source_id, hop), items in groups.items():
+            tree = self._tree(source_id, hop)
+            for i, dest_id, rate in items:
+                results[i] = self._build(tree, dest_id, rate)
+        return results
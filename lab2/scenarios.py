@@ -0,0 +1,161 @@
+from __future__ import annotations
+import argparse
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from lab2.main import Simulation
+from lab2.specs import ShipSpecs
+
+Metrics = Dict[str, float]
+
+
+@dataclass
+class ScenarioConfig:
+    ports: int = 20
+    ships: int = 10
+    containers: int = 1000
+    refrigerated_share: float = 0.1           # частка холодильних контейнерів
+    liquid_share: float = 0.1                 # частка рідких контейнерів
+    weight_range: Tuple[int, int] = (500, 8000)
+    fuel_range: Tuple[float, float] = (0.0, 50.0)
+    sails_per_ship: int = 3
+    specs: ShipSpecs = field(default_factory=lambda: ShipSpecs(100000, 40, 15, 5, 5, 1.0))
+
+
+def scenario_seed(base_seed: int, index: int) -> int:
+    """Зерно сценарію залежить лише від базового зерна та номера, а не від того, який процес його виконує."""
+    return random.Random(base_seed * 1_000_003 + index).getrandbits(63)
+
+
+def build_simulation(cfg: ScenarioConfig, seed: int) -> Simulation:
+    """Будує випадковий світ: порти, контейнери, розкладені по портах, і кораблі з випадковим паливом."""
+    rng = random.Random(seed)
+    sim = Simulation()
+    for pid in range(cfg.ports):
+        sim.create_port(pid, rng.uniform(-60.0, 60.0), rng.uniform(-180.0, 180.0))
+    r_edge = cfg.refrigerated_share
+    l_edge = r_edge + cfg.liquid_share
+    lo, hi = cfg.weight_range
+    for _ in range(cfg.containers):
+        roll = rng.random()
+        kind = "R" if roll < r_edge else "L" if roll < l_edge else None
+        cid = sim.create_container(rng.randint(lo, hi), kind=kind)
+        sim.place_container_in_port(cid, rng.randrange(cfg.ports))
+    fuel_lo, fuel_hi = cfg.fuel_range
+    for sid in range(cfg.ships):
+        sim.create_ship(sid, rng.randrange(cfg.ports), cfg.specs, fuel=rng.uniform(fuel_lo, fuel_hi))
+    return sim
+
+
+def run_scenario(cfg: ScenarioConfig, seed: int) -> Metrics:
+    """Один сценарій: кожен корабель забирає вантаж зі свого порту і робить кілька рейсів."""
+    rng = random.Random(seed ^ 0x5EED)
+    sim = build_simulation(cfg, seed)
+    attempts = accepted = sails = failed = 0
+    fuel_before = sum(s.fuel for s in sim.ships.values())
+    for _ in range(cfg.sails_per_ship):
+        for ship in sim.ships.values():
+            ids = [c.ID for c in ship.currentPort.containers]
+            ok, _ = sim.load_many(ship.ID, ids)
+            attempts += len(ids)
+            accepted += len(ok)
+            sails += 1
+            if not sim.sail(ship.ID, rng.randrange(cfg.ports)):
+                failed += 1
+    fuel_used = fuel_before - sum(s.fuel for s in sim.ships.values())
+    return {
+        "seed": seed,
+        "load_attempts": attempts,
+        "loads_accepted": accepted,
+        "acceptance_rate": accepted / attempts if attempts else 0.0,
+        "fuel_used": fuel_used,
+        "sails": sails,
+        "failed_sails": failed,
+    }
+
+
+def _run_chunk(cfg: ScenarioConfig, base_seed: int, indices: List[int]) -> List[Metrics]:
+    # Виконується в процесі-працівнику; назад повертаються лише невеликі словники метрик
+    results = []
+    for index in indices:
+        metrics = run_scenario(cfg, scenario_seed(base_seed, index))
+        metrics["index"] = index
+        results.append(metrics)
+    return results
+
+
+def run_scenarios(n: int, cfg: Optional[ScenarioConfig] = None, base_seed: int = 0,
+                  workers: Optional[int] = None, chunksize: int = 16) -> Iterator[Metrics]:
+    """
+    Виконує n сценаріїв і віддає метрики кожного щойно готова його порція.
+    workers=1 виконує все в поточному процесі; інакше – ProcessPoolExecutor з порціями по chunksize.
+    Порядок видачі може відрізнятися від порядку номерів, але значення залежать лише від base_seed.
+    """
+    cfg = cfg or ScenarioConfig()
+    chunks = [list(range(i, min(i + chunksize, n))) for i in range(0, n, chunksize)]
+    if workers == 1:
+        for chunk in chunks:
+            yield from _run_chunk(cfg, base_seed, chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_chunk, cfg, base_seed, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+class Summary:
+    """Зведення метрик: кількість сценаріїв, сума, мінімум і максимум кожної метрики."""
+
+    FIELDS = ("load_attempts", "loads_accepted", "acceptance_rate", "fuel_used", "sails", "failed_sails")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.sums = {f: 0.0 for f in self.FIELDS}
+        self.mins = {f: float("inf") for f in self.FIELDS}
+        self.maxs = {f: float("-inf") for f in self.FIELDS}
+
+    def add(self, metrics: Metrics) -> None:
+        self.count += 1
+        for f in self.FIELDS:
+            v = metrics[f]
+            self.sums[f] += v
+            if v < self.mins[f]:
+                self.mins[f] = v
+            if v > self.maxs[f]:
+                self.maxs[f] = v
+
+    def merge(self, other: "Summary") -> None:
+        self.count += other.count
+        for f in self.FIELDS:
+            self.sums[f] += other.sums[f]
+            self.mins[f] = min(self.mins[f], other.mins[f])
+            self.maxs[f] = max(self.maxs[f], other.maxs[f])
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        n = self.count or 1
+        return {f: {"mean": self.sums[f] / n, "min": self.mins[f], "max": self.maxs[f], "sum": self.sums[f]}
+                for f in self.FIELDS} | {"scenarios": self.count}
+
+
+def summarize(results: Iterable[Metrics]) -> Summary:
+    summary = Summary()
+    for metrics in results:
+        summary.add(metrics)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte-Carlo runs of Simulation scenarios")
+    parser.add_argument("-n", type=int, default=100, help="number of scenarios")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=16)
+    parser.add_argument("--ports", type=int, default=20)
+    parser.add_argument("--ships", type=int, default=10)
+    parser.add_argument("--containers", type=int, default=1000)
+    args = parser.parse_args()
+    config = ScenarioConfig(ports=args.ports, ships=args.ships, containers=args.containers)
+    result = summarize(run_scenarios(args.n, config, args.seed, args.workers, args.chunksize))
+    print(json.dumps(result.as_dict(), indent=2))
@@ -0,0 +1,320 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from lab2.export import port_record, ship_record
+from lab2.ingest import HANDLERS, Command, apply_commands
+
+# Протокол: JSON Lines в обидва боки.
+#   запит:   {"id": довільне значення, "op": ..., аргументи як у lab2/ingest.py}
+#   відповідь: {"id": те саме значення, "ok": true/false, "result": ...}
+# Клієнт може надсилати запити, не чекаючи відповідей (конвеєр); відповіді можуть приходити
+# не в порядку запитів (читання відповідають одразу, зміни – після своєї порції), тому
+# їх зіставляють за id.
+# Адреса: рядок – шлях до Unix-сокета, пара (host, port) – TCP.
+Address = Union[str, Tuple[str, int]]
+
+
+def _query_ship(sim, c):
+    return ship_record(sim.ships[int(c["ship"])])
+
+
+def _query_port(sim, c):
+    return port_record(sim.ports[int(c["port"])])
+
+
+def _query_estimate_fuel(sim, c):
+    return sim.estimate_fuel(int(c["ship"]), int(c["port"]))
+
+
+def _query_nearest(sim, c):
+    return sim.nearest_ports(float(c["lat"]), float(c["lon"]), int(c.get("k", 1)))
+
+
+def _query_reachable(sim, c):
+    return sim.reachable(int(c["ship"]))
+
+
+def _query_metrics(sim, c):
+    return sim.metrics_snapshot()
+
+
+# Запити лише для читання – виконуються одразу, без черги записувача
+QUERIES: Dict[str, Callable[[Any, Command], Any]] = {
+    "ship": _query_ship,
+    "port": _query_port,
+    "estimate_fuel": _query_estimate_fuel,
+    "nearest": _query_nearest,
+    "reachable": _query_reachable,
+    "metrics": _query_metrics,
+}
+
+
+class SimulationService:
+    """
+    Асинхронний фронтенд до однієї спільної Simulation.
+    Команди, що змінюють стан (HANDLERS з lab2/ingest.py), стають у чергу; єдиний записувач забирає
+    з неї все, що накопичилося (до batch_size), і виконує порцію через apply_commands
+    (послідовні load для одного корабля – одним load_many). Порція виконується без await,
+    тому запити на читання, які обслуговуються між порціями, завжди бачать узгоджений стан;
+    їх результати кешуються до наступної порції (version).
+    Помилкова команда (зокрема виняток в її обробнику) отримує відповідь ok=false, решта порції
+    виконується й отримує свої відповіді.
+    Зворотний тиск: черга обмежена queue_size (коли вона повна, сервер перестає читати сокети),
+    а кожне з'єднання може мати не більше max_pipeline запитів без відповіді.
+    """
+
+    def __init__(self, sim, batch_size: int = 1024, queue_size: int = 8192, max_pipeline: int = 256) -> None:
+        self.sim = sim
+        self.batch_size = int(batch_size)
+        self.queue_size = int(queue_size)
+        self.max_pipeline = int(max_pipeline)
+        self.version = 0        # кількість виконаних порцій змін
+        self.applied = 0        # кількість виконаних команд змін
+        self.address: Optional[Address] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._server = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._cache: Dict[str, Tuple[bool, Any]] = {}
+
+    def query(self, req: Command) -> Tuple[bool, Any]:
+        """Виконує запит на читання (з кешу, якщо стан не змінився)."""
+        key = json.dumps(sorted((k, v) for k, v in req.items() if k != "id"))
+        hit = self._cache.get(key)
+        if hit is not None:
+            return hit
+        try:
+            hit = True, QUERIES[req["op"]](self.sim, req)
+        except Exception as e:
+            hit = False, str(e)
+        self._cache[key] = hit
+        return hit
+
+    async def _write_loop(self) -> None:
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                results = apply_commands(self.sim, [(i, req) for i, (req, _) in enumerate(batch)])
+                outcomes = [(ok, result) for _, _, ok, result in results]
+            except Exception as e:
+                # apply_commands сам обробляє помилки кожної команди; сюди потрапляє лише збій
+                # поза командами – відмовляємо цій порції, записувач працює далі
+                outcomes = [(False, f"Batch failed: {type(e).__name__}: {e}")] * len(batch)
+            self.version += 1
+            self.applied += len(batch)
+            self._cache.clear()
+            for (_, future), outcome in zip(batch, outcomes):
+                if not future.done():
+                    future.set_result(outcome)
+            # Даємо з'єднанням дочитати запити – наступна порція буде більшою
+            await asyncio.sleep(0)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.max_pipeline)
+
+        def respond(rid, ok, result) -> None:
+            if not writer.is_closing():
+                writer.write((json.dumps({"id": rid, "ok": ok, "result": result}) + "\n").encode())
+            slots.release()
+
+        def on_done(future, rid) -> None:
+            if not future.cancelled():
+                respond(rid, *future.result())
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                await slots.acquire()
+                rid = None
+                try:
+                    req = json.loads(line)
+                    rid, op = req.get("id"), req.get("op")
+                    if not isinstance(op, str):
+                        raise ValueError(f"op must be a string, got {op!r}")
+                except (ValueError, AttributeError) as e:
+                    respond(rid, False, f"Bad request: {e}")
+                    continue
+                if op in QUERIES:
+                    respond(rid, *self.query(req))
+                elif op in HANDLERS:
+                    future = loop.create_future()
+                    future.add_done_callback(lambda f, rid=rid: on_done(f, rid))
+                    await self._queue.put((req, future))
+                else:
+                    respond(rid, False, f"Unknown op {op!r}")
+                await writer.drain()
+            # Клієнт закінчив надсилати – чекаємо відповіді на всі його запити
+            for _ in range(self.max_pipeline):
+                await slots.acquire()
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, address: Address) -> Address:
+        """Запускає сервер і записувача; повертає фактичну адресу (для TCP з port=0 – вибраний порт)."""
+        self._queue = asyncio.Queue(self.queue_size)
+        self._writer_task = asyncio.create_task(self._write_loop())
+        if isinstance(address, str):
+            self._server = await asyncio.start_unix_server(self._handle, path=address)
+            self.address = address
+        else:
+            host, port = address
+            self._server = await asyncio.start_server(self._handle, host, port)
+            self.address = self._server.sockets[0].getsockname()[:2]
+        return self.address
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+
+
+async def _connect(address: Address):
+    if isinstance(address, str):
+        return await asyncio.open_unix_connection(address)
+    return await asyncio.open_connection(*address)
+
+
+async def _client(address: Address, requests: List[Command], pipeline: int,
+                  latencies: List[float], responses: Dict[int, Dict]) -> None:
+    reader, writer = await _connect(address)
+    slots = asyncio.Semaphore(pipeline)
+    sent: Dict[int, float] = {}
+
+    async def receive() -> None:
+        for _ in range(len(requests)):
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("Service closed the connection")
+            resp = json.loads(line)
+            latencies.append(time.perf_counter() - sent.pop(resp["id"]))
+            responses[resp["id"]] = resp
+            slots.release()
+
+    receiver = asyncio.create_task(receive())
+    for req in requests:
+        await slots.acquire()
+        sent[req["id"]] = time.perf_counter()
+        writer.write((json.dumps(req) + "\n").encode())
+        await writer.drain()
+    await receiver
+    writer.close()
+
+
+async def load_generator(address: Address, requests: List[Command], connections: int = 4,
+                         pipeline: int = 64) -> Dict[str, Any]:
+    """
+    Клієнт для вимірювань: розподіляє запити між connections з'єднаннями, у кожному тримає
+    до pipeline запитів без відповіді. id запитів присвоюються тут (номер у списку).
+    Повертає пропускну здатність, p50/p99 затримки та відповіді за id.
+    """
+    requests = [dict(req, id=i) for i, req in enumerate(requests)]
+    latencies: List[float] = []
+    responses: Dict[int, Dict] = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(address, requests[i::connections], pipeline, latencies, responses)
+                           for i in range(connections)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def percentile(q: float) -> float:
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1e3
+
+    return {
+        "requests": len(requests),
+        "errors": sum(1 for r in responses.values() if not r["ok"]),
+        "seconds": elapsed,
+        "throughput": len(requests) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": percentile(0.50),
+        "p99_ms": percentile(0.99),
+        "responses": responses,
+    }
+
+
+def random_requests(n: int, ships: int, ports: int, containers: int, seed: int = 0) -> List[Command]:
+    """Суміш запитів для навантаження: завантаження, розвантаження, запити стану, дозаправка, рейси."""
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(n):
+        roll = rng.random()
+        ship = rng.randrange(ships)
+        if roll < 0.4:
+            requests.append({"op": "load", "ship": ship, "container": rng.randrange(containers)})
+        elif roll < 0.5:
+            requests.append({"op": "unload", "ship": ship, "container": rng.randrange(containers)})
+        elif roll < 0.8:
+            requests.append({"op": "ship", "ship": ship})
+        elif roll < 0.9:
+            requests.append({"op": "refuel", "ship": ship, "amount": 100.0})
+        else:
+            requests.append({"op": "sail", "ship": ship, "port": rng.randrange(ports)})
+    return requests
+
+
+def _address(args) -> Address:
+    return args.unix if args.unix else (args.host, args.port)
+
+
+async def _serve(args) -> None:
+    from lab2.main import Simulation
+    if args.snapshot:
+        sim = Simulation.restore(args.snapshot)
+    else:
+        from lab2.scenarios import ScenarioConfig, build_simulation
+        sim = build_simulation(ScenarioConfig(ports=args.ports, ships=args.ships, containers=args.containers),
+                               args.seed)
+    service = SimulationService(sim, batch_size=args.batch_size)
+    address = await service.start(_address(args))
+    print(f"serving on {address}", file=sys.stderr)
+    await service.serve_forever()
+
+
+async def _bench(args) -> None:
+    requests = random_requests(args.n, args.ships, args.ports, args.containers, args.seed)
+    report = await load_generator(_address(args), requests, args.connections, args.pipeline)
+    report.pop("responses")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Asyncio command service for a shared Simulation")
+    parser.add_argument("mode", choices=("serve", "bench"))
+    parser.add_argument("--unix", help="Unix socket path (default: TCP)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--snapshot", help="serve a Simulation restored from this snapshot")
+    parser.add_argument("--ports", type=int, default=20)
+    parser.add_argument("--ships", type=int, default=10)
+    parser.add_argument("--containers", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("-n", type=int, default=100_000, help="bench: number of requests")
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--pipeline", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(_serve(args) if args.mode == "serve" else _bench(args))
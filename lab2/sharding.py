@@ -0,0 +1,454 @@
+from __future__ import annotations
+import json
+import multiprocessing
+import sys
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from lab2.containers import KIND_CLASSES, make_container
+from lab2.export import port_record, port_text, ship_record
+from lab2.metrics import REJECT_AT_SEA, REJECT_NO_FUEL, REJECT_UNKNOWN_SHIP
+from lab2.port import Port
+from lab2.ship import Ship
+from lab2.specs import ShipSpecs
+
+# Регіон за координатами порту: номер шарду від 0 до n_shards - 1
+Region = Callable[[float, float, int], int]
+
+# Корабель у дорозі між шардами: (ID, ShipSpecs, паливо, [(ID контейнера, вага, KIND)])
+Handoff = Tuple[int, ShipSpecs, float, List[Tuple[int, int, int]]]
+
+
+def longitude_bands(lat: float, lon: float, n_shards: int) -> int:
+    """Регіони – рівні смуги довготи."""
+    return min(n_shards - 1, int((lon + 180.0) / 360.0 * n_shards))
+
+
+# ---- Операції, які виконує процес шарду поверх звичайних методів Simulation ----
+
+def _add_container(sim, cid: int, weight: int, kind, port_id: int) -> None:
+    # Контейнер з ID, виданим координатором, одразу в порт шарду
+    sim.containers[cid] = make_container(cid, weight, kind)
+    sim.place_container_in_port(cid, port_id)
+
+
+def _put_container(sim, cid: int, weight: int, kind: int, port_id: int) -> None:
+    # Контейнер з іншого шарду (тип – код KIND) у порт цього шарду
+    sim.containers[cid] = KIND_CLASSES[kind](cid, weight)
+    sim.place_container_in_port(cid, port_id)
+
+
+def _take_container(sim, cid: int) -> Tuple[int, int]:
+    # Контейнер переходить у порт іншого шарду: забираємо його з порту цього шарду
+    cont = sim.containers[cid]
+    for port in sim.ports.values():
+        if cont in port.containers:
+            port.containers.remove(cont)
+            break
+    else:
+        raise ValueError("Container is on a ship in another region")
+    del sim.containers[cid]
+    return cont.weight, cont.KIND
+
+
+def _move_container(sim, cid: int, port_id: int) -> None:
+    # Розміщення в іншому порту того самого шарду – теж переміщення, як і між шардами
+    port = sim.ports.get(port_id)
+    if port is None:
+        raise ValueError("Container or port not found")
+    if sim.containers[cid] in port.containers:
+        raise ValueError(f"Container {cid} already in store")
+    weight, kind = _take_container(sim, cid)
+    _put_container(sim, cid, weight, kind, port_id)
+
+
+def _handoff_prepare(sim, ship_id: int, dest_id: int, lat: float, lon: float) -> Tuple[Optional[str], Optional[Handoff]]:
+    # Перша фаза рейсу в інший шард: ті самі перевірки, що й Ship.try_depart, але без змін стану
+    ship = sim.ships.get(ship_id)
+    if ship is None:
+        return REJECT_UNKNOWN_SHIP, None
+    if ship.currentPort is None:
+        return REJECT_AT_SEA, None
+    required = ship.estimate_fuel(Port(dest_id, lat, lon))
+    if ship.fuel < required:
+        return REJECT_NO_FUEL, None
+    cargo = [(c.ID, c.weight, c.KIND) for c in ship._containers]
+    return None, (ship.ID, ship.specs, ship.fuel - required, cargo)
+
+
+def _handoff_commit(sim, ship_id: int, dest_id: int, lat: float, lon: float) -> None:
+    # Остання фаза: шард призначення вже прийняв корабель – відправляємо і видаляємо його тут
+    ship = sim.ships[ship_id]
+    reason = ship.try_depart(Port(dest_id, lat, lon))
+    if reason is not None:
+        raise RuntimeError(f"Ship {ship_id} cannot depart after handoff was prepared: {reason}")
+    del sim.ships[ship_id]
+    for c in ship._containers:
+        del sim.containers[c.ID]
+
+
+def _handoff_in(sim, state: Handoff, dest_id: int) -> None:
+    # Прибуття корабля з іншого шарду: відтворюємо його з вантажем і виконуємо звичайне прибуття.
+    # Якщо прибуття не вдалося, прибираємо все додане – корабель лишається в шарді відправлення
+    sid, specs, fuel, cargo = state
+    port = sim.ports[dest_id]
+    ship = Ship(sid, None, specs, fuel=fuel)
+    added = []
+    try:
+        for cid, weight, kind in cargo:
+            if cid in sim.containers:
+                raise ValueError(f"Container {cid} already exists in this region")
+            cont = sim.containers[cid] = KIND_CLASSES[kind](cid, weight)
+            added.append(cont)
+            ship._containers.append(cont)
+            ship._count_in(cont)
+        sim.ships[sid] = ship
+        sim._arrive(ship, port)
+    except Exception:
+        sim.ships.pop(sid, None)
+        for cont in added:
+            del sim.containers[cont.ID]
+            if cont in port.containers:
+                port.containers.remove(cont)
+        if ship in port.current:
+            port.outgoingShip(ship)
+        raise
+
+
+def _batch(sim, calls: List[Tuple[str, tuple]]) -> List[Tuple[bool, Any]]:
+    # Порція викликів одним повідомленням; помилка одного виклику не зупиняє решту
+    results = []
+    for op, args in calls:
+        try:
+            results.append((True, _dispatch(sim, op, args)))
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+
+def _estimate_to(sim, ship_id: int, port_id: int, lat: float, lon: float) -> float:
+    if port_id in sim.ports:
+        return sim.estimate_fuel(ship_id, port_id)
+    ship = sim.ships.get(ship_id)
+    if ship is None:
+        raise ValueError("Ship or port not found")
+    return ship.estimate_fuel(Port(port_id, lat, lon))
+
+
+def _render(sim, fmt: str) -> List[Tuple[int, int, str]]:
+    # Шматки виводу з ключем сортування (0 – порт, 1 – корабель; ID)
+    if fmt == "text":
+        return [(0, pid, port_text(p)) for pid, p in sim.ports.items()]
+    chunks = [(0, pid, json.dumps(port_record(p)) + "\n") for pid, p in sim.ports.items()]
+    chunks += [(1, sid, json.dumps(ship_record(s)) + "\n") for sid, s in sim.ships.items()]
+    return chunks
+
+
+SHARD_OPS: Dict[str, Callable] = {
+    "add_container": _add_container,
+    "take_container": _take_container,
+    "put_container": _put_container,
+    "move_container": _move_container,
+    "handoff_prepare": _handoff_prepare,
+    "handoff_commit": _handoff_commit,
+    "handoff_in": _handoff_in,
+    "estimate_to": _estimate_to,
+    "render": _render,
+    "batch": _batch,
+}
+
+
+def _dispatch(sim, op: str, args: tuple) -> Any:
+    fn = SHARD_OPS.get(op)
+    return fn(sim, *args) if fn is not None else getattr(sim, op)(*args)
+
+
+def _shard_main(conn, distance_cache: bool) -> None:
+    # Цикл процесу шарду: (назва, аргументи) -> (успіх, результат або виняток)
+    from lab2.main import Simulation
+    sim = Simulation(distance_cache=distance_cache)
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            break
+        op, args = msg
+        try:
+            conn.send((True, _dispatch(sim, op, args)))
+        except Exception as e:
+            conn.send((False, e))
+    conn.close()
+
+
+class ShardedSimulation:
+    """
+    Simulation, розділена за географічними регіонами між процесами-шардами.
+    Кожен шард – окремий процес зі своєю Simulation (порти регіону, їхні кораблі й контейнери).
+    Координатор має той самий API, що й Simulation, тримає лише таблиці "об'єкт -> шард"
+    і координати портів та пересилає виклик шарду, якому належить корабель чи порт.
+    Рейс у порт іншого регіону – передача: шард відправлення списує паливо і віддає корабель
+    з вантажем повідомленням, шард призначення відтворює його і виконує прибуття.
+    Передача двофазна: шард відправлення лише перевіряє рейс, шард призначення приймає корабель,
+    і тільки тоді шард відправлення списує паливо й видаляє корабель – збій прийому нічого не втрачає.
+    Пакетні методи (load_many_batch, sail_many) спершу розсилають роботу всім шардам і лише потім
+    збирають відповіді, тож шарди працюють паралельно; поодинокі виклики – послідовні обміни.
+    Контейнер, ще не розміщений у порту, зберігається в координаторі. Розміщення вже розміщеного
+    контейнера в іншому порту переносить його (зі старого порту він зникає) – і в межах регіону,
+    і між регіонами; контейнер на борту корабля так перенести не можна – ValueError.
+    """
+
+    def __init__(self, n_shards: int = 4, region: Region = longitude_bands, distance_cache: bool = True) -> None:
+        if n_shards < 1:
+            raise ValueError("n_shards must be positive")
+        self.n_shards = n_shards
+        self.region = region
+        self.port_shard: Dict[int, int] = {}
+        self.ship_shard: Dict[int, int] = {}
+        self.container_shard: Dict[int, int] = {}
+        self._coords: Dict[int, Tuple[float, float]] = {}
+        self._unplaced: Dict[int, Tuple[int, Any]] = {}    # ID -> (вага, тип) ще не розміщених контейнерів
+        self._next_container_id = 0
+        self._conns = []
+        self._procs = []
+        for _ in range(n_shards):
+            parent, child = multiprocessing.Pipe()
+            proc = multiprocessing.Process(target=_shard_main, args=(child, distance_cache), daemon=True)
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+
+    def __enter__(self) -> "ShardedSimulation":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for conn in self._conns:
+            try:
+                conn.send(None)
+                conn.close()
+            except OSError:
+                pass
+        for proc in self._procs:
+            proc.join(timeout=5)
+        self._conns = []
+        self._procs = []
+
+    def _call(self, shard: int, op: str, *args) -> Any:
+        conn = self._conns[shard]
+        conn.send((op, args))
+        ok, result = conn.recv()
+        if not ok:
+            raise result
+        return result
+
+    def _fanout(self, calls: Dict[int, List[Tuple[str, tuple]]]) -> Dict[int, List[Tuple[bool, Any]]]:
+        # Кожен шард отримує свою порцію одним повідомленням; відповіді збираємо після розсилки
+        for shard, shard_calls in calls.items():
+            self._conns[shard].send(("batch", (shard_calls,)))
+        replies = {}
+        for shard in calls:
+            ok, result = self._conns[shard].recv()
+            if not ok:
+                raise result
+            replies[shard] = result
+        return replies
+
+    def _broadcast(self, op: str, *args) -> List[Any]:
+        # Спочатку надсилаємо всім шардам, потім збираємо відповіді – шарди працюють паралельно
+        for conn in self._conns:
+            conn.send((op, args))
+        results = []
+        error = None
+        for conn in self._conns:
+            ok, result = conn.recv()
+            if not ok and error is None:
+                error = result
+            results.append(result)
+        if error is not None:
+            raise error
+        return results
+
+    def create_port(self, ID, lat, lon):
+        if ID in self.port_shard:
+            raise ValueError("Port exists")
+        shard = self.region(float(lat), float(lon), self.n_shards)
+        self._call(shard, "create_port", ID, lat, lon)
+        self.port_shard[ID] = shard
+        self._coords[ID] = (float(lat), float(lon))
+
+    def create_ship(self, ID, port_id, specs: ShipSpecs, fuel=0.0):
+        if ID in self.ship_shard:
+            raise ValueError("Ship exists")
+        shard = self.port_shard.get(port_id)
+        if shard is None:
+            raise ValueError("Port not found")
+        self._call(shard, "create_ship", ID, port_id, specs, fuel)
+        self.ship_shard[ID] = shard
+
+    def create_container(self, weight, kind=None):
+        cid = self._next_container_id
+        self._next_container_id += 1
+        self._unplaced[cid] = (weight, kind)
+        return cid
+
+    def place_container_in_port(self, cid, port_id):
+        shard = self.port_shard.get(port_id)
+        if shard is None or (cid not in self._unplaced and cid not in self.container_shard):
+            raise ValueError("Container or port not found")
+        if cid in self._unplaced:
+            weight, kind = self._unplaced[cid]
+            self._call(shard, "add_container", cid, weight, kind, port_id)
+            del self._unplaced[cid]
+            self.container_shard[cid] = shard
+        elif self.container_shard[cid] == shard:
+            self._call(shard, "move_container", cid, port_id)
+        else:
+            weight, kind = self._call(self.container_shard[cid], "take_container", cid)
+            self._call(shard, "put_container", cid, weight, kind, port_id)
+            self.container_shard[cid] = shard
+
+    def load(self, ship_id, container_id):
+        shard = self.ship_shard.get(ship_id)
+        # Контейнер з іншого регіону не може бути в порту корабля
+        if shard is None or self.container_shard.get(container_id) != shard:
+            return False
+        return self._call(shard, "load", ship_id, container_id)
+
+    def load_many(self, ship_id, container_ids):
+        return self.load_many_batch([(ship_id, container_ids)])[0]
+
+    def load_many_batch(self, requests):
+        """
+        Кілька load_many [(ship_id, container_ids), ...] одним проходом: шарди виконують
+        свої запити паралельно. Повертає [(accepted, rejected), ...] у порядку запитів.
+        """
+        requests = [(sid, list(cids)) for sid, cids in requests]
+        results = [([], cids) for _, cids in requests]
+        foreign: Dict[int, List[int]] = {}
+        calls: Dict[int, List[Tuple[int, Tuple[str, tuple]]]] = {}
+        for i, (sid, cids) in enumerate(requests):
+            shard = self.ship_shard.get(sid)
+            if shard is None:
+                continue
+            local = [cid for cid in cids if self.container_shard.get(cid) == shard]
+            # Контейнер з іншого регіону не може бути в порту корабля
+            foreign[i] = [cid for cid in cids if self.container_shard.get(cid) != shard]
+            calls.setdefault(shard, []).append((i, ("load_many", (sid, local))))
+        replies = self._fanout({shard: [c for _, c in items] for shard, items in calls.items()})
+        error = None
+        for shard, items in calls.items():
+            for (i, _), (ok, result) in zip(items, replies[shard]):
+                if not ok:
+                    error = error or result
+                    continue
+                accepted, rejected = result
+                results[i] = accepted, rejected + foreign[i]
+        if error is not None:
+            raise error
+        return results
+
+    def unload(self, ship_id, container_id):
+        shard = self.ship_shard.get(ship_id)
+        if shard is None:
+            return False
+        return self._call(shard, "unload", ship_id, container_id)
+
+    def refuel(self, ship_id, amount):
+        shard = self.ship_shard.get(ship_id)
+        if shard is None:
+            return False
+        return self._call(shard, "refuel", ship_id, amount)
+
+    def sail(self, ship_id, dest_port_id):
+        return self.sail_many([(ship_id, dest_port_id)])[0]
+
+    def sail_many(self, moves):
+        """
+        Рейси [(ship_id, dest_port_id), ...] одним проходом; кожен корабель – не більше одного разу.
+        Рейси в межах регіону і перевірки передач виконуються паралельно в усіх шардах,
+        далі паралельно прибуття в шардах призначення і завершення передач. Повертає [bool, ...].
+        """
+        moves = list(moves)
+        if len({sid for sid, _ in moves}) != len(moves):
+            raise ValueError("Each ship may sail at most once per sail_many call")
+        results = [False] * len(moves)
+        errors = []
+
+        def collect(calls, on_result):
+            replies = self._fanout({shard: [c for _, c in items] for shard, items in calls.items()})
+            for shard, items in calls.items():
+                for (i, _), (ok, result) in zip(items, replies[shard]):
+                    if ok:
+                        on_result(i, shard, result)
+                    else:
+                        errors.append(result)
+
+        # 1. Рейси в межах регіону і перевірка рейсів між регіонами
+        first: Dict[int, list] = {}
+        for i, (sid, dest) in enumerate(moves):
+            shard, dest_shard = self.ship_shard.get(sid), self.port_shard.get(dest)
+            if shard is None or dest_shard is None:
+                continue
+            if shard == dest_shard:
+                first.setdefault(shard, []).append((i, ("sail", (sid, dest))))
+            else:
+                lat, lon = self._coords[dest]
+                first.setdefault(shard, []).append((i, ("handoff_prepare", (sid, dest, lat, lon))))
+        arrivals: Dict[int, list] = {}
+        handoffs: Dict[int, Handoff] = {}
+
+        def after_first(i, shard, result):
+            sid, dest = moves[i]
+            if self.port_shard[dest] == shard:
+                results[i] = result
+                return
+            reason, state = result
+            if reason is None:
+                handoffs[i] = state
+                arrivals.setdefault(self.port_shard[dest], []).append((i, ("handoff_in", (state, dest))))
+
+        collect(first, after_first)
+
+        # 2. Прибуття в шардах призначення; 3. лише прийняті кораблі видаляються з шардів відправлення
+        commits: Dict[int, list] = {}
+
+        def after_arrival(i, shard, result):
+            sid, dest = moves[i]
+            lat, lon = self._coords[dest]
+            commits.setdefault(self.ship_shard[sid], []).append((i, ("handoff_commit", (sid, dest, lat, lon))))
+
+        if arrivals:
+            collect(arrivals, after_arrival)
+
+        def after_commit(i, shard, result):
+            sid, dest = moves[i]
+            dest_shard = self.port_shard[dest]
+            self.ship_shard[sid] = dest_shard
+            for cid, _, _ in handoffs[i][3]:
+                self.container_shard[cid] = dest_shard
+            results[i] = True
+
+        if commits:
+            collect(commits, after_commit)
+        if errors:
+            raise errors[0]
+        return results
+
+    def estimate_fuel(self, ship_id, dest_port_id):
+        shard = self.ship_shard.get(ship_id)
+        if shard is None or dest_port_id not in self._coords:
+            raise ValueError("Ship or port not found")
+        lat, lon = self._coords[dest_port_id]
+        return self._call(shard, "estimate_to", ship_id, dest_port_id, lat, lon)
+
+    def export_state(self, out, fmt="jsonl"):
+        # Зібраний з усіх шардів стан у порядку ID, як у Simulation.export_state (формати text і jsonl)
+        if fmt not in ("text", "jsonl"):
+            raise ValueError(f"Unknown export format {fmt!r}")
+        chunks = [c for shard_chunks in self._broadcast("render", fmt) for c in shard_chunks]
+        chunks.sort(key=lambda c: (c[0], c[1]))
+        out.write("".join(text for _, _, text in chunks))
+        return len(chunks)
+
+    def print_state(self):
+        self.export_state(sys.stdout, fmt="text")
@@ -1,12 +1,17 @@
 from __future__ import annotations
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterable, Tuple
 from lab2.specs import ShipSpecs
-from lab2.containers import Container, HeavyContainer, RefrigeratedContainer, LiquidContainer
+from lab2.containers import Container, TYPE_KEYS, KIND_BASIC, KIND_HEAVY, KIND_REFRIGERATED, KIND_LIQUID
 from lab2.port import Port
+from lab2.metrics import (REJECT_AT_SEA, REJECT_WRONG_PORT, REJECT_NOT_ON_BOARD, REJECT_WEIGHT, REJECT_TOTAL,
+                          REJECT_HEAVY, REJECT_REFRIGERATED, REJECT_LIQUID, REJECT_NO_FUEL)
 
 CONSUMPTION_SCALE = 1.0 / 1000.0
 
 class Ship:
+    # Фіксований набір полів замість __dict__ – менше пам'яті на кожен корабель
+    __slots__ = ("ID", "fuel", "currentPort", "destination", "specs", "_containers", "_heavy", "_refrigerated", "_liquid",
+                 "_weight_sum", "_cargo_consumption", "_dirty")
 
     def __init__(self, ID: int, initial_port: Optional[Port], specs: ShipSpecs, fuel: float = 0.0):
        
@@ -15,74 +20,159 @@ class Ship:
         self.currentPort: Optional[Port] = initial_port  # Поточний порт (None якщо корабель в морі)
         if initial_port is not None:
             initial_port.incomingShip(self)  # Додаємо корабель до порту
+        self.destination: Optional[Port] = None  # Порт призначення поточного рейсу (лише в морі)
         self.specs = specs # Специфікації корабля (макс. вага, кількість контейнерів, витрата палива)
         self._containers: List[Container] = []  # Список контейнерів на кораблі
+        # Лічильники вантажу – оновлюються при load/unLoad/sailTo, щоб не перераховувати список
+        self._heavy = 0          # важкі (разом з холодильними та рідкими)
+        self._refrigerated = 0   # холодильні
+        self._liquid = 0         # рідкі
+        self._weight_sum = 0     # сумарна вага
+        self._cargo_consumption = 0.0   # сумарний внесок вантажу у витрату палива на 1 км
+        self._dirty = True       # стан змінився з часу останнього експорту (lab2/export.py)
 
     def _counts(self):
         """
         Повертає словник з поточними кількостями контейнерів:
         загальна, важкі, холодильні, рідкі, а також сумарна вага.
-        Використовується для перевірки перед завантаженням нового контейнера.
+        Значення беруться з лічильників, тому виклик коштує O(1).
         """
-        total = len(self._containers)
-        heavy = sum(1 for c in self._containers if isinstance(c, HeavyContainer))
-        refrigerated = sum(1 for c in self._containers if isinstance(c, RefrigeratedContainer))
-        liquid = sum(1 for c in self._containers if isinstance(c, LiquidContainer))
-        weight_sum = sum(c.weight for c in self._containers)
         return {
-            "total": total,
-            "heavy": heavy,
-            "refrigerated": refrigerated,
-            "liquid": liquid,
-            "weight_sum": weight_sum
+            "total": len(self._containers),
+            "heavy": self._heavy,
+            "refrigerated": self._refrigerated,
+            "liquid": self._liquid,
+            "weight_sum": self._weight_sum
         }
 
-    def load(self, cont: Container) -> bool:
-        if self.currentPort is None:
-            return False
+    def _count_in(self, cont: Container) -> None:
+        # Оновлює лічильники після додавання контейнера на борт
+        self._dirty = True
+        self._weight_sum += cont.weight
+        self._cargo_consumption += cont.consumption()
+        kind = cont.KIND
+        if kind != KIND_BASIC:   # холодильні та рідкі – теж важкі
+            self._heavy += 1
+            if kind == KIND_REFRIGERATED:
+                self._refrigerated += 1
+            elif kind == KIND_LIQUID:
+                self._liquid += 1
 
-        if cont not in self.currentPort.containers:
-            return False
+    def _count_out(self, cont: Container) -> None:
+        # Оновлює лічильники після зняття контейнера з борту
+        self._dirty = True
+        self._weight_sum -= cont.weight
+        self._cargo_consumption -= cont.consumption()
+        kind = cont.KIND
+        if kind != KIND_BASIC:
+            self._heavy -= 1
+            if kind == KIND_REFRIGERATED:
+                self._refrigerated -= 1
+            elif kind == KIND_LIQUID:
+                self._liquid -= 1
+
+    def _reset_counts(self) -> None:
+        self._dirty = True
+        self._heavy = 0
+        self._refrigerated = 0
+        self._liquid = 0
+        self._weight_sum = 0
+        self._cargo_consumption = 0.0
 
-        counts = self._counts()
+    def _reject_reason(self, cont: Container) -> Optional[str]:
+        """Перевіряє ліміти ShipSpecs; повертає код причини відмови (lab2/metrics.py) або None, якщо контейнер вміщується."""
+        specs = self.specs
 
     # Перевірка сумарної ваги
-        if counts["weight_sum"] + cont.weight > self.specs.totalWeightCapacity:
-            return False
+        if self._weight_sum + cont.weight > specs.totalWeightCapacity:
+            return REJECT_WEIGHT
 
     # Перевірка загальної кількості контейнерів
-        if self.specs.maxNumberOfAllContainers != 0 and counts["total"] + 1 > self.specs.maxNumberOfAllContainers:
-            return False
+        if specs.maxNumberOfAllContainers != 0 and len(self._containers) + 1 > specs.maxNumberOfAllContainers:
+            return REJECT_TOTAL
 
     # Перевірка лімітів по типу контейнера
-        if isinstance(cont, RefrigeratedContainer):
-            if self.specs.maxNumberOfRefrigeratedContainers != 0 and counts["refrigerated"] + 1 > self.specs.maxNumberOfRefrigeratedContainers:
-                return False
-        elif isinstance(cont, LiquidContainer):
-            if self.specs.maxNumberOfLiquidContainers != 0 and counts["liquid"] + 1 > self.specs.maxNumberOfLiquidContainers:
-                return False
-        elif isinstance(cont, HeavyContainer):
-            if self.specs.maxNumberOfHeavyContainers != 0 and counts["heavy"] + 1 > self.specs.maxNumberOfHeavyContainers:
-                return False
+        kind = cont.KIND
+        if kind == KIND_REFRIGERATED:
+            if specs.maxNumberOfRefrigeratedContainers != 0 and self._refrigerated + 1 > specs.maxNumberOfRefrigeratedContainers:
+                return REJECT_REFRIGERATED
+        elif kind == KIND_LIQUID:
+            if specs.maxNumberOfLiquidContainers != 0 and self._liquid + 1 > specs.maxNumberOfLiquidContainers:
+                return REJECT_LIQUID
+        elif kind == KIND_HEAVY:
+            if specs.maxNumberOfHeavyContainers != 0 and self._heavy + 1 > specs.maxNumberOfHeavyContainers:
+                return REJECT_HEAVY
+        return None
+
+    def try_load(self, cont: Container) -> Optional[str]:
+        """Як load, але повертає причину відмови (None – контейнер завантажено)."""
+        if self.currentPort is None:
+            return REJECT_AT_SEA
+
+        if cont not in self.currentPort.containers:
+            return REJECT_WRONG_PORT
+
+        reason = self._reject_reason(cont)
+        if reason is not None:
+            return reason
 
     # Всі перевірки пройдено – переміщаємо контейнер з порту на корабель
         self.currentPort.containers.remove(cont)
         self._containers.append(cont)
-        return True
-
+        self._count_in(cont)
+        return None
 
+    def load(self, cont: Container) -> bool:
+        return self.try_load(cont) is None
 
-    def unLoad(self, cont: Container) -> bool:
+    def load_many(self, conts: Iterable[Container],
+                  reasons: Optional[Dict[str, int]] = None) -> Tuple[List[int], List[int]]:
         """
-        Розвантажує контейнер у поточний порт.
+        Пакетне завантаження за один прохід.
+        Повертає (ID прийнятих, ID відхилених) контейнерів у порядку подачі.
+        Якщо передано reasons, у ньому рахуються відмови за причинами.
         """
+        accepted: List[int] = []
+        rejected: List[int] = []
+        if self.currentPort is None:
+            rejected = [c.ID for c in conts]
+            if reasons is not None and rejected:
+                reasons[REJECT_AT_SEA] = reasons.get(REJECT_AT_SEA, 0) + len(rejected)
+            return accepted, rejected
+
+        port_containers = self.currentPort.containers
+        for cont in conts:
+            # Перевірка наявності та видалення з порту – O(1) завдяки ContainerStore
+            reason = REJECT_WRONG_PORT if cont not in port_containers else self._reject_reason(cont)
+            if reason is None:
+                port_containers.remove(cont)
+                self._containers.append(cont)
+                self._count_in(cont)
+                accepted.append(cont.ID)
+            else:
+                rejected.append(cont.ID)
+                if reasons is not None:
+                    reasons[reason] = reasons.get(reason, 0) + 1
+        return accepted, rejected
+
+
+
+    def try_unLoad(self, cont: Container) -> Optional[str]:
+        """Як unLoad, але повертає причину відмови (None – контейнер розвантажено)."""
         if cont not in self._containers:
-            return False
+            return REJECT_NOT_ON_BOARD
         if self.currentPort is None:
-            return False
+            return REJECT_AT_SEA
         self._containers.remove(cont)
+        self._count_out(cont)
         self.currentPort.containers.append(cont)
-        return True
+        return None
+
+    def unLoad(self, cont: Container) -> bool:
+        """
+        Розвантажує контейнер у поточний порт.
+        """
+        return self.try_unLoad(cont) is None
 
     def reFuel(self, amount: float) -> None:
         """
@@ -91,64 +181,84 @@ class Ship:
         if amount < 0:
             raise ValueError("Негативне пальне")
         self.fuel += amount
+        self._dirty = True
 
     def _containers_consumption_per_km(self) -> float:
         """
         Обчислює сумарний внесок всіх контейнерів у витрату палива на 1 км.
+        Значення підтримується лічильником при load/unLoad, тому виклик коштує O(1).
         """
-        return sum(c.consumption() for c in self._containers)
+        return self._cargo_consumption
+
+    def fuel_per_km(self) -> float:
+        """Витрата палива корабля на 1 км: власна витрата корабля плюс внесок вантажу (її використовує sailTo)."""
+        return self.specs.fuelConsumptionPerKM * CONSUMPTION_SCALE + self._cargo_consumption
+
+    def estimate_fuel(self, destination_port) -> float:
+        """Скільки палива піде на перехід з поточного порту до destination_port з поточним вантажем."""
+        if self.currentPort is None:
+            raise ValueError("Ship is at sea")
+        return self.currentPort.getDistance(destination_port) * self.fuel_per_km()
+
+    def try_depart(self, destination_port) -> Optional[str]:
+        """
+        Відправляє корабель у рейс: списує паливо на весь перехід і виводить його з порту.
+        Після цього корабель у морі (currentPort = None), вантаж лишається на борту.
+        Повертає причину відмови або None.
+        """
+        if self.currentPort is None:
+            return REJECT_AT_SEA
 
-    def sailTo(self, destination_port):
         # Обчислюємо відстань до нового порту
         distance = self.currentPort.getDistance(destination_port)
 
-        # Витрата палива = дистанція * коефіцієнт витрати * CONSUMPTION_SCALE
-        required_fuel = distance * self.specs.fuelConsumptionPerKM * CONSUMPTION_SCALE
+        # Витрата палива = дистанція * (коефіцієнт витрати * CONSUMPTION_SCALE + внесок вантажу)
+        required_fuel = distance * self.fuel_per_km()
 
         # Перевірка пального
         if self.fuel < required_fuel:
-            return False
+            return REJECT_NO_FUEL
 
         # Використовуємо паливо
         self.fuel -= required_fuel
+        self._dirty = True
 
-        # Видаляємо корабель з поточного порту
+        # Видаляємо корабель з поточного порту; прибути він може лише в порт призначення
         self.currentPort.outgoingShip(self)
+        self.currentPort = None
+        self.destination = destination_port
+        return None
+
+    def depart(self, destination_port) -> bool:
+        return self.try_depart(destination_port) is None
 
-        # Переносимо всі контейнери у новий порт
-        for c in list(self._containers):  # тут треба self._containers
-            destination_port.containers.append(c)
-            self._containers.remove(c)
+    def arrive(self, destination_port) -> None:
+        """Завершує рейс: вивантажує весь вантаж у порт призначення і ставить корабель у порт."""
+        # Переносимо весь вантаж у новий порт одним пакетом
+        if self._containers:
+            destination_port.containers.extend(self._containers)
+            self._containers.clear()
+        self._reset_counts()
 
         # Додаємо корабель у новий порт
         self.currentPort = destination_port
+        self.destination = None
         destination_port.incomingShip(self)
 
+    def sailTo(self, destination_port):
+        # Миттєвий рейс: відправлення і прибуття одразу
+        if not self.depart(destination_port):
+            return False
+        self.arrive(destination_port)
         return True
 
 
-
-
         # Повертає словник із списками ID контейнерів на кораблі за типами.
     def containers_by_type(self) -> Dict[str, list]:
-        types = {
-            "basic_container": [],
-            "heavy_container": [],
-            "refrigerated_container": [],
-            "liquid_container": []
-        }
+        types = {k: [] for k in TYPE_KEYS}
+        # Ключ типу – атрибут класу контейнера, тож без порівняння назв класів
         for c in self._containers:
-            types_key = None
-            if type(c).__name__ == "BasicContainer":
-                types_key = "basic_container"
-            elif type(c).__name__ == "RefrigeratedContainer":
-                types_key = "refrigerated_container"
-            elif type(c).__name__ == "LiquidContainer":
-                types_key = "liquid_container"
-            elif type(c).__name__ == "HeavyContainer":
-                types_key = "heavy_container"
-            if types_key:
-                types[types_key].append(c.ID)
+            types[c.TYPE_KEY].append(c.ID)
         for k in types:
             types[k].sort()
         return types
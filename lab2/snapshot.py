@@ -0,0 +1,263 @@
+from __future__ import annotations
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List, Optional
+from lab2.containers import Container, KIND_CLASSES
+from lab2.ship import Ship
+from lab2.specs import ShipSpecs
+
+# Формат файлу (little-endian):
+#   заголовок: MAGIC, версія, к-сть портів, кораблів, контейнерів, _next_container_id
+#   порти:      ID (q), широта (d), довгота (d)
+#   кораблі:    ID (q), порт (q, -1 = у морі), паливо (d), 5 цілих лімітів ShipSpecs (q),
+#               fuelConsumptionPerKM (d), speedKMPerHour (d), порт призначення рейсу (q, -1 = немає)
+#   контейнери: ID (q), вага (q), ID місця (q), код типу KIND (b), тип місця (b)
+# Кожна колонка вирівняна на 8 байт, тому її можна читати через mmap без копіювання.
+# Контейнери записані групами за місцем (порт, потім корабель) у порядку зберігання.
+MAGIC = b"LAB2SNAP"
+VERSION = 2
+_HEADER = struct.Struct("<8sIIqqqq")
+
+LOC_NONE, LOC_PORT, LOC_SHIP = 0, 1, 2
+
+_PORT_COLUMNS = "qdd"
+_SHIP_COLUMNS = "qqdqqqqqddq"
+_CONTAINER_COLUMNS = "qqqbb"
+
+
+def _check_byteorder() -> None:
+    if sys.byteorder != "little":
+        raise RuntimeError("Snapshots are only supported on little-endian machines")
+
+
+def _write_column(f, typecode: str, values) -> None:
+    data = array(typecode, values).tobytes()
+    f.write(data)
+    pad = -len(data) % 8
+    if pad:
+        f.write(b"\0" * pad)
+
+
+def _read_columns(buf: memoryview, offset: int, typecodes: str, n: int):
+    columns = []
+    for code in typecodes:
+        size = struct.calcsize(code) * n
+        columns.append(buf[offset:offset + size].cast(code))
+        offset += size + (-size % 8)
+    return columns, offset
+
+
+def save(sim, path: str) -> None:
+    """Записує стан симуляції у двійковий файл."""
+    _check_byteorder()
+    ports = list(sim.ports.values())
+    ships = list(sim.ships.values())
+
+    # Контейнери групуємо за місцем, зберігаючи порядок усередині порту чи корабля
+    ids: List[int] = []
+    loc_kind: List[int] = []
+    loc_id: List[int] = []
+    placed = set()
+    for p in ports:
+        for c in p.containers:
+            ids.append(c.ID)
+            loc_kind.append(LOC_PORT)
+            loc_id.append(p.ID)
+    for s in ships:
+        for c in s._containers:
+            ids.append(c.ID)
+            loc_kind.append(LOC_SHIP)
+            loc_id.append(s.ID)
+    placed.update(ids)
+    for cid in sim.containers:
+        if cid not in placed:
+            ids.append(cid)
+            loc_kind.append(LOC_NONE)
+            loc_id.append(-1)
+    containers = sim.containers
+    conts = [containers[cid] for cid in ids]
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, 0, len(ports), len(ships), len(ids), sim._next_container_id))
+        _write_column(f, "q", (p.ID for p in ports))
+        _write_column(f, "d", (p.latitude for p in ports))
+        _write_column(f, "d", (p.longitude for p in ports))
+
+        _write_column(f, "q", (s.ID for s in ships))
+        _write_column(f, "q", (s.currentPort.ID if s.currentPort is not None else -1 for s in ships))
+        _write_column(f, "d", (s.fuel for s in ships))
+        _write_column(f, "q", (s.specs.totalWeightCapacity for s in ships))
+        _write_column(f, "q", (s.specs.maxNumberOfAllContainers for s in ships))
+        _write_column(f, "q", (s.specs.maxNumberOfHeavyContainers for s in ships))
+        _write_column(f, "q", (s.specs.maxNumberOfRefrigeratedContainers for s in ships))
+        _write_column(f, "q", (s.specs.maxNumberOfLiquidContainers for s in ships))
+        _write_column(f, "d", (s.specs.fuelConsumptionPerKM for s in ships))
+        _write_column(f, "d", (s.specs.speedKMPerHour for s in ships))
+        _write_column(f, "q", (s.destination.ID if s.destination is not None else -1 for s in ships))
+
+        _write_column(f, "q", ids)
+        _write_column(f, "q", (c.weight for c in conts))
+        _write_column(f, "q", loc_id)
+        _write_column(f, "b", (c.KIND for c in conts))
+        _write_column(f, "b", loc_kind)
+
+
+class LazyContainers(MutableMapping):
+    """
+    Словник контейнерів {ID: Container}, що створює об'єкти лише при першому зверненні.
+    Вага і тип беруться з колонок знімка (memoryview над mmap).
+    """
+
+    def __init__(self, ids, weights, kinds, mm: Optional[mmap.mmap] = None) -> None:
+        self._loaded: Dict[int, Container] = {}
+        self._rows: Dict[int, int] = dict(zip(ids, range(len(ids))))   # ID -> рядок у колонках
+        self._weights = weights
+        self._kinds = kinds
+        self._mm = mm   # тримаємо відображення файлу відкритим, поки є відкладені контейнери
+
+    def __getitem__(self, cid: int) -> Container:
+        cont = self._loaded.get(cid)
+        if cont is None:
+            row = self._rows[cid]    # KeyError для невідомого ID
+            cont = self._loaded[cid] = KIND_CLASSES[self._kinds[row]](cid, self._weights[row])
+            del self._rows[cid]
+            if not self._rows:
+                self._release()
+        return cont
+
+    def get(self, cid, default=None):
+        cont = self._loaded.get(cid)
+        if cont is not None:
+            return cont
+        if cid in self._rows:
+            return self[cid]
+        return default
+
+    def __setitem__(self, cid: int, cont: Container) -> None:
+        self._rows.pop(cid, None)
+        self._loaded[cid] = cont
+
+    def __delitem__(self, cid: int) -> None:
+        if cid in self._loaded:
+            del self._loaded[cid]
+        else:
+            del self._rows[cid]
+
+    def __contains__(self, cid: object) -> bool:
+        return cid in self._loaded or cid in self._rows
+
+    def __iter__(self) -> Iterator[int]:
+        yield from list(self._loaded)
+        yield from list(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._loaded) + len(self._rows)
+
+    @property
+    def pending(self) -> int:
+        """Скільки контейнерів ще не створено."""
+        return len(self._rows)
+
+    def _release(self) -> None:
+        # Усі контейнери створені – колонки й mmap більше не потрібні
+        self._weights.release()
+        self._kinds.release()
+        self._weights = self._kinds = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+
+def restore(path: str, lazy: bool = False, **sim_kwargs):
+    """
+    Відновлює Simulation зі знімка. Файл читається через mmap.
+    lazy=True: об'єкти Container для контейнерів у портах і поза ними створюються лише при
+    першому зверненні (вантаж кораблів створюється одразу, бо від нього залежать лічильники).
+    """
+    from lab2.main import Simulation
+
+    _check_byteorder()
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    buf = memoryview(mm)
+    magic, version, _, n_ports, n_ships, n_conts, next_id = _HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != VERSION:
+        buf.release()
+        mm.close()
+        raise ValueError("Not a Simulation snapshot")
+    offset = _HEADER.size
+    port_cols, offset = _read_columns(buf, offset, _PORT_COLUMNS, n_ports)
+    ship_cols, offset = _read_columns(buf, offset, _SHIP_COLUMNS, n_ships)
+    cont_cols, offset = _read_columns(buf, offset, _CONTAINER_COLUMNS, n_conts)
+
+    sim = Simulation(**sim_kwargs)
+    for pid, lat, lon in zip(*(c.tolist() for c in port_cols)):
+        sim.create_port(pid, lat, lon)
+    ports = sim.ports
+    for sid, pid, fuel, cap, total, heavy, refr, liquid, rate, speed, dest in zip(*(c.tolist() for c in ship_cols)):
+        specs = ShipSpecs(cap, total, heavy, refr, liquid, rate, speed)
+        ship = sim.ships[sid] = Ship(sid, ports[pid] if pid >= 0 else None, specs, fuel=fuel)
+        if dest >= 0:
+            ship.destination = ports[dest]
+    sim._next_container_id = next_id
+
+    ids, weights, loc_ids, kinds, loc_kinds = cont_cols
+    id_list = ids.tolist()
+    kind_list = kinds.tolist()
+    loc_kind_list = loc_kinds.tolist()
+    loc_id_list = loc_ids.tolist()
+    if lazy:
+        # Колонки ваги й типу лишаються memoryview над файлом – копій немає.
+        # mmap віддаємо контейнерам лише в кінці: поки restore тримає buf і колонки, закривати його не можна
+        containers = sim.containers = LazyContainers(id_list, weights, kinds)
+    else:
+        classes = KIND_CLASSES
+        containers = sim.containers = {
+            cid: classes[kind](cid, weight) for cid, weight, kind in zip(id_list, weights.tolist(), kind_list)
+        }
+
+    # Контейнери записані суцільними групами за місцем – відновлюємо групу за раз
+    start = 0
+    while start < n_conts:
+        where, lid = loc_kind_list[start], loc_id_list[start]
+        end = start + 1
+        while end < n_conts and loc_kind_list[end] == where and loc_id_list[end] == lid:
+            end += 1
+        if where == LOC_PORT:
+            if lazy:
+                ports[lid].containers.add_lazy(id_list[start:end], kind_list[start:end], containers.__getitem__)
+            else:
+                ports[lid].containers.extend(containers[cid] for cid in id_list[start:end])
+        elif where == LOC_SHIP:
+            ship = sim.ships[lid]
+            for cid in id_list[start:end]:
+                cont = containers[cid]
+                ship._containers.append(cont)
+                ship._count_in(cont)
+        start = end
+
+    if sim.registry is not None:
+        registry = sim.registry
+        for cid, weight, kind, where, lid in zip(id_list, weights.tolist(), kind_list, loc_kind_list, loc_id_list):
+            registry.add(cid, weight, kind)
+            if where == LOC_PORT:
+                registry.set_port(cid, lid)
+            elif where == LOC_SHIP:
+                registry.set_ship(cid, lid)
+
+    # Звільняємо всі колонки, крім ваги й типу, які ще потрібні відкладеним контейнерам
+    keep = (weights, kinds) if lazy and containers.pending else ()
+    for col in port_cols + ship_cols + cont_cols:
+        if not any(col is k for k in keep):
+            col.release()
+    buf.release()
+    if keep:
+        containers._mm = mm
+    else:
+        if lazy:
+            containers._weights = containers._kinds = None
+        mm.close()
+    return sim
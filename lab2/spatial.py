@@ -0,0 +1,165 @@
+from __future__ import annotations
+import heapq
+import math
+from array import array
+from typing import Dict, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # без numpy повний перегляд виконується звичайним циклом
+    np = None
+
+EARTH_RADIUS_KM = 6371.0   # той самий радіус, що й у Port.getDistance
+
+SCAN_FACTOR = 8   # повний перегляд, якщо клітинок для обходу більше ніж len / SCAN_FACTOR
+
+# Результат запиту: (ID порту, відстань у км), від найближчого
+Hit = Tuple[int, float]
+
+
+def _unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    phi, lam = math.radians(lat), math.radians(lon)
+    cos_phi = math.cos(phi)
+    return cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi)
+
+
+def _chord_to_km(chord: float) -> float:
+    return 2.0 * EARTH_RADIUS_KM * math.asin(min(chord / 2.0, 1.0))
+
+
+def _km_to_chord(km: float) -> float:
+    if km >= math.pi * EARTH_RADIUS_KM:
+        return 2.0
+    return 2.0 * math.sin(km / (2.0 * EARTH_RADIUS_KM))
+
+
+class SpatialIndex:
+    """
+    Просторовий індекс портів: точки на одиничній сфері (3D-вектори) в рівномірній сітці кубів.
+    Пряма відстань (хорда) між векторами монотонна з відстанню по дузі, тому пошук іде по
+    сусідніх клітинках і не потребує гаверсина для кожного порту. Якщо запит зачіпає багато
+    клітинок порівняно з кількістю портів (великий радіус або мало портів), – повний перегляд
+    колонок (векторний, якщо є numpy).
+    """
+
+    def __init__(self, cell_km: float = 200.0) -> None:
+        if cell_km <= 0:
+            raise ValueError("cell_km must be positive")
+        self.cell = _km_to_chord(cell_km)
+        self._cells: Dict[Tuple[int, int, int], List[int]] = {}   # клітинка -> рядки в колонках
+        self._rows: Dict[int, int] = {}                            # ID порту -> рядок
+        self._ids = array("q")
+        self._x = array("d")
+        self._y = array("d")
+        self._z = array("d")
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _key(self, x: float, y: float, z: float) -> Tuple[int, int, int]:
+        s = self.cell
+        return math.floor(x / s), math.floor(y / s), math.floor(z / s)
+
+    def add(self, port_id: int, lat: float, lon: float) -> None:
+        if port_id in self._rows:
+            raise ValueError(f"Port {port_id} already indexed")
+        x, y, z = _unit_vector(lat, lon)
+        row = len(self._ids)
+        self._rows[port_id] = row
+        self._ids.append(port_id)
+        self._x.append(x)
+        self._y.append(y)
+        self._z.append(z)
+        self._cells.setdefault(self._key(x, y, z), []).append(row)
+
+    def _point(self, port_id: int) -> Tuple[float, float, float]:
+        row = self._rows[port_id]   # KeyError для невідомого порту
+        return self._x[row], self._y[row], self._z[row]
+
+    def _scan(self, qx: float, qy: float, qz: float, max_chord: float) -> List[Tuple[float, int]]:
+        # Повний перегляд: (хорда^2, рядок) для всіх точок не далі max_chord
+        limit = max_chord * max_chord
+        if np is not None and len(self._ids):
+            xs = np.frombuffer(self._x, dtype=np.float64)
+            ys = np.frombuffer(self._y, dtype=np.float64)
+            zs = np.frombuffer(self._z, dtype=np.float64)
+            d2 = (xs - qx) ** 2 + (ys - qy) ** 2 + (zs - qz) ** 2
+            rows = np.nonzero(d2 <= limit)[0]
+            result = list(zip(d2[rows].tolist(), rows.tolist()))
+            del xs, ys, zs   # звільняємо буфери array, щоб до них знову можна було дописувати
+            return result
+        result = []
+        for row, (x, y, z) in enumerate(zip(self._x, self._y, self._z)):
+            d2 = (x - qx) ** 2 + (y - qy) ** 2 + (z - qz) ** 2
+            if d2 <= limit:
+                result.append((d2, row))
+        return result
+
+    def _cell_rows(self, key: Tuple[int, int, int], qx: float, qy: float, qz: float, out: list) -> None:
+        rows = self._cells.get(key)
+        if rows:
+            xs, ys, zs = self._x, self._y, self._z
+            for row in rows:
+                out.append(((xs[row] - qx) ** 2 + (ys[row] - qy) ** 2 + (zs[row] - qz) ** 2, row))
+
+    def _hits(self, found: List[Tuple[float, int]], exclude: int = -1) -> List[Hit]:
+        ids = self._ids
+        return [(ids[row], _chord_to_km(math.sqrt(d2))) for d2, row in sorted(found) if row != exclude]
+
+    def _within_point(self, qx: float, qy: float, qz: float, km: float, exclude: int = -1) -> List[Hit]:
+        chord = _km_to_chord(km)
+        m = math.ceil(chord / self.cell)
+        # Обхід клітинок у Python дорожчий за векторний перегляд, тому переходимо на нього раніше
+        if (2 * m + 1) ** 3 * SCAN_FACTOR > len(self._ids):
+            return self._hits(self._scan(qx, qy, qz, chord), exclude)
+        cx, cy, cz = self._key(qx, qy, qz)
+        limit = chord * chord
+        found: List[Tuple[float, int]] = []
+        for dx in range(-m, m + 1):
+            for dy in range(-m, m + 1):
+                for dz in range(-m, m + 1):
+                    self._cell_rows((cx + dx, cy + dy, cz + dz), qx, qy, qz, found)
+        return self._hits([f for f in found if f[0] <= limit], exclude)
+
+    def within(self, lat: float, lon: float, km: float) -> List[Hit]:
+        """Усі порти не далі km від точки, від найближчого."""
+        return self._within_point(*_unit_vector(lat, lon), km)
+
+    def within_radius(self, port_id: int, km: float) -> List[Hit]:
+        """Усі інші порти не далі km від порту port_id, від найближчого."""
+        return self._within_point(*self._point(port_id), km, exclude=self._rows[port_id])
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Hit]:
+        """k найближчих портів до точки, від найближчого."""
+        n = len(self._ids)
+        if k <= 0 or n == 0:
+            return []
+        k = min(k, n)
+        qx, qy, qz = _unit_vector(lat, lon)
+        cx, cy, cz = self._key(qx, qy, qz)
+        found: List[Tuple[float, int]] = []
+        r = 0
+        visited = 0
+        while True:
+            # Оболонка куба на відстані r клітинок (за Чебишевим) від клітинки запиту
+            shell = 1 if r == 0 else (2 * r + 1) ** 3 - (2 * r - 1) ** 3
+            visited += shell
+            if visited > n:
+                # Пошук розійшовся ширше, ніж є портів – дешевше переглянути всі
+                return self._hits(heapq.nsmallest(k, self._scan(qx, qy, qz, 2.0)))
+            for dx in range(-r, r + 1):
+                for dy in range(-r, r + 1):
+                    if abs(dx) == r or abs(dy) == r:
+                        for dz in range(-r, r + 1):
+                            self._cell_rows((cx + dx, cy + dy, cz + dz), qx, qy, qz, found)
+                    else:
+                        self._cell_rows((cx + dx, cy + dy, cz - r), qx, qy, qz, found)
+                        if r:
+                            self._cell_rows((cx + dx, cy + dy, cz + r), qx, qy, qz, found)
+            # Непереглянуті клітинки не ближчі за r * cell, тож k-та знайдена точка вже остаточна
+            if len(found) >= k:
+                best = heapq.nsmallest(k, found)
+                bound = r * self.cell
+                if best[-1][0] <= bound * bound:
+                    return self._hits(best)
+            r += 1
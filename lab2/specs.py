@@ -8,3 +8,4 @@ class ShipSpecs:
     maxNumberOfRefrigeratedContainers: int    # Максимальна кількість холодильних контейнерів
     maxNumberOfLiquidContainers: int          # Максимальна кількість рідких контейнерів
     fuelConsumptionPerKM: float               # Базова витрата палива корабля на км без урахування контейнерів
+    speedKMPerHour: float = 37.0              # Крейсерська швидкість (км/год), для симуляції з часом
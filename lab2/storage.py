@@ -0,0 +1,146 @@
+from __future__ import annotations
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from lab2.containers import Container, TYPE_KEYS
+
+_KIND_OF_KEY = {key: kind for kind, key in enumerate(TYPE_KEYS)}   # ключ типу -> код KIND
+
+
+class ContainerStore:
+    """
+    Сховище контейнерів порту.
+    Зберігає порядок додавання, дає O(1) додавання, перевірку та видалення за ID
+    і тримає окремі кошики для кожного типу контейнера.
+    Підтримує основні операції списку (append, remove, in, len, ітерація),
+    тому старий код, що працював з port.containers як зі списком, не змінюється.
+    Після відновлення зі знімка (lab2/snapshot.py) елементи можуть бути ще не створені:
+    тоді замість контейнера зберігається None, а об'єкт створює _loader при першому зверненні.
+    """
+
+    __slots__ = ("_items", "_buckets", "_sorted", "_loader", "dirty")
+
+    def __init__(self, items: Iterable[Container] = ()) -> None:
+        self._items: Dict[int, Optional[Container]] = {}           # ID -> контейнер (None – ще не створений)
+        # Кошики і кеш відсортованих ID – списки, індексовані кодом типу KIND
+        self._buckets: List[Dict[int, Optional[Container]]] = [{} for _ in TYPE_KEYS]
+        self._sorted: List[Optional[List[int]]] = [None] * len(TYPE_KEYS)
+        self._loader: Optional[Callable[[int], Container]] = None   # створює контейнер за ID
+        self.dirty = True    # вміст змінився з часу останнього експорту (lab2/export.py)
+        self.extend(items)
+
+    def add_lazy(self, ids: List[int], kinds: List[int], loader: Callable[[int], Container]) -> None:
+        """Додає контейнери лише за ID і кодом типу; об'єкти створюються через loader за потреби."""
+        self._loader = loader
+        self._items.update(dict.fromkeys(ids))
+        buckets = self._buckets
+        for cid, kind in zip(ids, kinds):
+            buckets[kind][cid] = None
+        self._sorted = [None] * len(TYPE_KEYS)
+        self.dirty = True
+
+    def _resolve(self, cid: int) -> Optional[Container]:
+        # Повертає контейнер за ID, створюючи відкладений об'єкт при першому зверненні
+        item = self._items.get(cid)
+        if item is None and self._loader is not None and cid in self._items:
+            item = self._items[cid] = self._loader(cid)
+            self._buckets[item.KIND][cid] = item
+        return item
+
+    def add(self, cont: Container) -> None:
+        if cont.ID in self._items:
+            raise ValueError(f"Container {cont.ID} already in store")
+        self._items[cont.ID] = cont
+        kind = cont.KIND
+        self._buckets[kind][cont.ID] = cont
+        self._sorted[kind] = None
+        self.dirty = True
+
+    append = add  # сумісність зі списком
+
+    def extend(self, conts: Iterable[Container]) -> None:
+        """Додає багато контейнерів за раз (наприклад, весь вантаж корабля при прибутті)."""
+        conts = list(conts)
+        new = {c.ID: c for c in conts}
+        if not new:
+            return
+        if len(new) != len(conts):
+            seen = set()
+            dup = next(c.ID for c in conts if c.ID in seen or seen.add(c.ID))
+            raise ValueError(f"Container {dup} already in store")
+        if not self._items.keys().isdisjoint(new):
+            dup = next(cid for cid in new if cid in self._items)
+            raise ValueError(f"Container {dup} already in store")
+        self._items.update(new)
+        buckets = self._buckets
+        touched = set()
+        for cid, cont in new.items():
+            kind = cont.KIND
+            buckets[kind][cid] = cont
+            touched.add(kind)
+        for kind in touched:
+            self._sorted[kind] = None
+        self.dirty = True
+
+    def remove(self, cont: Container) -> None:
+        if self._resolve(cont.ID) is not cont:
+            raise ValueError(f"Container {cont.ID} not in store")
+        del self._items[cont.ID]
+        kind = cont.KIND
+        del self._buckets[kind][cont.ID]
+        self._sorted[kind] = None
+        self.dirty = True
+
+    def discard(self, cont: Container) -> bool:
+        """Видаляє контейнер, якщо він є. Повертає True, якщо щось було видалено."""
+        if self._resolve(cont.ID) is not cont:
+            return False
+        self.remove(cont)
+        return True
+
+    def get(self, cid: int) -> Optional[Container]:
+        return self._resolve(cid)
+
+    def clear(self) -> None:
+        self._items.clear()
+        for bucket in self._buckets:
+            bucket.clear()
+        self._sorted = [None] * len(TYPE_KEYS)
+        self.dirty = True
+
+    def bucket(self, key: str) -> Iterable[Container]:
+        """Контейнери одного типу в порядку додавання."""
+        bucket = self._buckets[_KIND_OF_KEY[key]]
+        if self._loader is None:
+            return bucket.values()
+        return [item if item is not None else self._resolve(cid) for cid, item in list(bucket.items())]
+
+    def sorted_ids(self, key: str) -> List[int]:
+        """Відсортовані ID контейнерів одного типу (кешуються до наступної зміни кошика)."""
+        kind = _KIND_OF_KEY[key]
+        ids = self._sorted[kind]
+        if ids is None:
+            ids = self._sorted[kind] = sorted(self._buckets[kind])
+        return ids
+
+    def __contains__(self, cont: object) -> bool:
+        if not isinstance(cont, Container):
+            return False
+        item = self._items.get(cont.ID)
+        if item is None:
+            item = self._resolve(cont.ID)
+        return item is cont
+
+    def __iter__(self) -> Iterator[Container]:
+        if self._loader is None:
+            return iter(self._items.values())
+        return self._iter_lazy()
+
+    def _iter_lazy(self) -> Iterator[Container]:
+        # Заміна значення існуючого ключа не змінює розмір словника, тому ітерація безпечна
+        for cid, item in self._items.items():
+            yield item if item is not None else self._resolve(cid)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __repr__(self) -> str:
+        return f"ContainerStore({list(self)!r})"
@@ -2,6 +2,7 @@ import unittest
 from lab2.containers import BasicContainer, HeavyContainer, RefrigeratedContainer, LiquidContainer, CONSUMPTION_SCALE
 from lab2.specs import ShipSpecs
 from lab2.main import Simulation
+from lab2.registry import np
 
 class SimpleTests(unittest.TestCase):
     # Тестуємо правильність розрахунку споживання палива контейнерами
@@ -33,10 +34,716 @@ class SimpleTests(unittest.TestCase):
         # Перевіряємо, що корабель може поплисти в порт 1
         ok = sim.sail(0, 1)
         self.assertTrue(ok)
-        # Розвантажуємо контейнер у порті 1
-        self.assertTrue(sim.unload(0, cid))
+        # sailTo вивантажує весь вантаж у порт призначення, тому на борту контейнера вже немає
+        self.assertFalse(sim.unload(0, cid))
         # Перевіряємо, що контейнер тепер знаходиться в порті 1
         self.assertIn(sim.containers[cid], sim.ports[1].containers)
+        self.assertEqual(sim.ships[0]._counts()["total"], 0)
+
+    # Тестуємо пакетне завантаження та лічильники вантажу
+    def test_load_many(self):
+        sim = Simulation()
+        sim.create_port(0, 0.0, 0.0)
+        ids = [sim.create_container(1000), sim.create_container(5000),
+               sim.create_container(1000, kind="R"), sim.create_container(1000, kind="R")]
+        for cid in ids:
+            sim.place_container_in_port(cid, 0)
+        specs = ShipSpecs(10000, 10, 10, 1, 10, 0.1)
+        sim.create_ship(0, 0, specs)
+        accepted, rejected = sim.load_many(0, ids + [999])
+        # Другий холодильний контейнер не проходить за лімітом, 999 не існує
+        self.assertEqual(accepted, ids[:3])
+        self.assertEqual(rejected, [ids[3], 999])
+        self.assertEqual([c.ID for c in sim.ports[0].containers], [ids[3]])
+        self.assertEqual(sim.ships[0]._counts(),
+                         {"total": 3, "heavy": 2, "refrigerated": 1, "liquid": 0, "weight_sum": 7000})
+        self.assertTrue(sim.unload(0, ids[1]))
+        self.assertEqual(sim.ships[0]._counts()["heavy"], 1)
+
+    # Тестуємо індексоване сховище контейнерів порту
+    def test_port_container_store(self):
+        sim = Simulation()
+        sim.create_port(0, 0.0, 0.0)
+        ids = [sim.create_container(w, kind=k) for w, k in
+               [(1000, None), (5000, None), (2000, "L"), (500, None), (800, "R")]]
+        for cid in reversed(ids):
+            sim.place_container_in_port(cid, 0)
+        port = sim.ports[0]
+        self.assertEqual(len(port.containers), 5)
+        self.assertEqual([c.ID for c in port.containers], list(reversed(ids)))
+        self.assertEqual(port.containers_by_type(), {
+            "basic_container": [ids[0], ids[3]],
+            "heavy_container": [ids[1]],
+            "refrigerated_container": [ids[4]],
+            "liquid_container": [ids[2]],
+        })
+        # Повторне розміщення того ж контейнера в порту не допускається
+        with self.assertRaises(ValueError):
+            sim.place_container_in_port(ids[0], 0)
+        # Як і add, пакетне extend не допускає повторів – ні зі сховищем, ні всередині пакета
+        dup = sim.containers[sim.create_container(700)]
+        with self.assertRaises(ValueError):
+            port.containers.extend([dup, dup])
+        self.assertNotIn(dup, port.containers)
+        port.containers.remove(sim.containers[ids[0]])
+        self.assertNotIn(sim.containers[ids[0]], port.containers)
+        self.assertEqual(port.containers_by_type()["basic_container"], [ids[3]])
+
+    # Тестуємо колонковий реєстр контейнерів
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_columnar_registry(self):
+        sim = Simulation(columnar=True)
+        sim.create_port(0, 0.0, 0.0)
+        sim.create_port(1, 0.1, 0.1)
+        ids = [sim.create_container(1000), sim.create_container(5000),
+               sim.create_container(2000, kind="R"), sim.create_container(3000, kind="L")]
+        for cid in ids:
+            sim.place_container_in_port(cid, 0)
+        sim.create_ship(0, 0, ShipSpecs(20000, 10, 10, 10, 10, 0.1), fuel=1000.0)
+        sim.load_many(0, ids[1:])
+        reg = sim.registry
+        self.assertEqual(reg.weight_by_port(), {0: 1000})
+        self.assertEqual(reg.weight_by_ship(), {0: 10000})
+        expected = sum(sim.containers[cid].consumption() for cid in ids[1:])
+        self.assertAlmostEqual(reg.consumption_by_ship()[0], expected)
+        self.assertEqual(reg.type_histogram(ship_id=0),
+                         {"basic_container": 0, "heavy_container": 1,
+                          "refrigerated_container": 1, "liquid_container": 1})
+        self.assertEqual(reg.heaviest(2), [ids[1], ids[3]])
+        self.assertTrue(sim.sail(0, 1))
+        self.assertEqual(reg.weight_by_port(), {0: 1000, 1: 10000})
+        self.assertEqual(reg.weight_by_ship(), {})
+
+    # Тестуємо кеш відстаней між портами
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_distance_matrix(self):
+        from lab2.port import Port
+        coords = [(50.45, 30.52), (46.48, 30.73), (0.0, 0.0), (-33.9, 151.2), (40.7, -74.0)]
+        sim = Simulation()
+        for pid, (lat, lon) in enumerate(coords):
+            sim.create_port(pid, lat, lon)
+        plain = [Port(pid, lat, lon) for pid, (lat, lon) in enumerate(coords)]
+        for a in range(len(coords)):
+            for b in range(len(coords)):
+                self.assertAlmostEqual(sim.ports[a].getDistance(sim.ports[b]),
+                                       plain[a].getDistance(plain[b]), places=6)
+        block = sim.distances([0, 3], [1, 4, 0])
+        self.assertEqual(block.shape, (2, 3))
+        self.assertAlmostEqual(block[1][1], plain[3].getDistance(plain[4]), places=6)
+        self.assertEqual(block[0][2], 0.0)
+        # Після межі кеш вимикається, відстані ті самі (скалярно)
+        small = Simulation(distance_cache_max_ports=3)
+        for pid, (lat, lon) in enumerate(coords):
+            small.create_port(pid, lat, lon)
+        self.assertIsNone(small.distance_matrix)
+        self.assertAlmostEqual(small.ports[3].getDistance(small.ports[4]), plain[3].getDistance(plain[4]), places=6)
+        self.assertAlmostEqual(small.distances([3], [4])[0][0], plain[3].getDistance(plain[4]), places=6)
+
+    # Тестуємо планування маршруту з дозаправками
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_route_planner(self):
+        from lab2.routing import RoutePlanner
+        sim = Simulation()
+        # Порти на екваторі приблизно через 111 км
+        for pid in range(3):
+            sim.create_port(pid, 0.0, float(pid))
+        sim.create_port(3, 0.0, 10.0)
+        specs = ShipSpecs(10000, 10, 10, 10, 10, 1000.0)  # 1 одиниця палива на км
+        sim.create_ship(0, 0, specs, fuel=150.0)
+        sim.create_ship(1, 0, specs, fuel=300.0)
+        planner = RoutePlanner(sim)
+        route = planner.route(0, 2)
+        # Прямий перехід 0 -> 2 довший за бак, тому маршрут іде через порт 1
+        self.assertEqual(route.ports, [0, 1, 2])
+        self.assertEqual(route.stops, [1])
+        self.assertAlmostEqual(route.distance, sim.ports[0].getDistance(sim.ports[2]), places=3)
+        self.assertAlmostEqual(route.fuel, route.distance)
+        self.assertIsNone(planner.route(0, 3))
+        routes = planner.plan_fleet([(0, 2), (1, 2), (1, 3)])
+        self.assertEqual(routes[0].ports, [0, 1, 2])
+        self.assertEqual(routes[1].ports, [0, 2])
+        self.assertIsNone(routes[2])
+        # Кеш відстаней вимикається після межі – планувальник рахує рядки відстаней на льоту
+        capped = Simulation(distance_cache_max_ports=3)
+        for pid in range(3):
+            capped.create_port(pid, 0.0, float(pid))
+        early = RoutePlanner(capped)
+        capped.create_port(3, 0.0, 10.0)
+        self.assertIsNone(capped.distance_matrix)
+        capped.create_ship(0, 0, specs, fuel=150.0)
+        capped.create_ship(1, 0, specs, fuel=300.0)
+        routes = early.plan_fleet([(0, 2), (1, 2), (1, 3)])
+        self.assertEqual([r and r.ports for r in routes], [[0, 1, 2], [0, 2], None])
+        self.assertAlmostEqual(routes[0].distance, route.distance, places=6)
+
+    # Тестуємо планувальник завантаження з лімітами за типами
+    def test_load_planner(self):
+        from lab2.loadplan import load_best, distribute
+        sim = Simulation()
+        sim.create_port(0, 0.0, 0.0)
+        ids = [sim.create_container(4000, kind="R"), sim.create_container(5000),
+               sim.create_container(4500), sim.create_container(4000), sim.create_container(1000)]
+        for cid in ids:
+            sim.place_container_in_port(cid, 0)
+        sim.create_ship(0, 0, ShipSpecs(20000, 10, 2, 1, 1, 0.1))
+        accepted, rejected = load_best(sim, 0)
+        # Важкі 5000 і 4500 мають завантажитися раніше за холодильний, інакше ліміт важких не пропустить другий
+        self.assertEqual(sorted(accepted), sorted([ids[0], ids[1], ids[2], ids[4]]))
+        self.assertEqual(rejected, [])
+        self.assertEqual(sim.ships[0]._weight_sum, 14500)
+
+        # У порту лишився важкий 4000; додаємо ще три і розподіляємо між двома кораблями
+        sim.create_ship(1, 0, ShipSpecs(6000, 10, 5, 5, 5, 0.1))
+        sim.create_ship(2, 0, ShipSpecs(4500, 10, 5, 5, 5, 0.1))
+        extra = [sim.create_container(2500), sim.create_container(3500), sim.create_container(500)]
+        for cid in extra:
+            sim.place_container_in_port(cid, 0)
+        result = distribute(sim, 0, ship_ids=[1, 2])
+        self.assertEqual(sorted(result[1][0]), extra[:2])
+        self.assertEqual(sorted(result[2][0]), [ids[3], extra[2]])
+        self.assertEqual(len(sim.ports[0].containers), 0)
+
+    # Тестуємо дискретно-подійну симуляцію рейсу
+    def test_event_engine(self):
+        from lab2.events import EventEngine, ARRIVE
+        sim = Simulation()
+        sim.create_port(0, 0.0, 0.0)
+        sim.create_port(1, 0.0, 1.0)
+        cid = sim.create_container(1000)
+        sim.place_container_in_port(cid, 0)
+        sim.create_ship(0, 0, ShipSpecs(10000, 10, 10, 10, 10, 0.1, speedKMPerHour=37.0), fuel=1000.0)
+        events = []
+        engine = EventEngine(sim, on_event=events.append)
+        engine.schedule_sail(1.0, 0, 1)
+        engine.schedule_load(0.5, 0, [cid])
+        hours = sim.ports[0].getDistance(sim.ports[1]) / 37.0
+        # Завантаження і відправлення виконані, корабель у морі
+        self.assertEqual(engine.run_until(2.0), 2)
+        self.assertEqual(events[0][4], ([cid], []))
+        self.assertIsNone(sim.ships[0].currentPort)
+        self.assertNotIn(sim.ships[0], sim.ports[0].current)
+        # Прибуття через distance / speed годин після відправлення
+        event = engine.step()
+        self.assertEqual(event[1], ARRIVE)
+        self.assertAlmostEqual(event[0], 1.0 + hours)
+        self.assertIs(sim.ships[0].currentPort, sim.ports[1])
+        self.assertIn(sim.containers[cid], sim.ports[1].containers)
+        self.assertIsNone(engine.step())
+        # Відправлення за розкладом проходить через Simulation.depart і потрапляє в метрики
+        sim.enable_metrics()
+        engine.schedule_sail(engine.now + 1.0, 0, 0)
+        sim.ships[0].fuel = 0.0
+        engine.run_until(engine.now + 1.0)
+        self.assertEqual(sim.metrics_snapshot()["depart"]["rejections"], {"no_fuel": 1})
+        # Годинник журналу належить рушію лише під час виконання подій
+        self.assertIsNone(sim.ledger.clock)
+        # Корабель у морі прибуває лише в порт призначення, за який заплатив паливом
+        sim.ships[0].fuel = 1000.0
+        self.assertTrue(sim.depart(0, 0))
+        self.assertFalse(sim.arrive(0, 1))
+        self.assertEqual(sim.metrics_snapshot()["arrive"]["rejections"], {"wrong_destination": 1})
+        self.assertTrue(sim.arrive(0, 0))
+
+    # Тестуємо відтворюваність паралельного запуску сценаріїв
+    def test_scenario_runner(self):
+        from lab2.scenarios import ScenarioConfig, run_scenarios, summarize
+        cfg = ScenarioConfig(ports=5, ships=3, containers=200)
+        local = sorted(run_scenarios(6, cfg, base_seed=7, workers=1, chunksize=4), key=lambda m: m["index"])
+        pooled = sorted(run_scenarios(6, cfg, base_seed=7, workers=2, chunksize=2), key=lambda m: m["index"])
+        self.assertEqual(local, pooled)
+        summary = summarize(pooled)
+        self.assertEqual(summary.count, 6)
+        self.assertEqual(summary.sums["sails"], 6 * 3 * cfg.sails_per_ship)
+        self.assertLessEqual(summary.maxs["acceptance_rate"], 1.0)
+
+    # Тестуємо збереження та відновлення знімка (звичайне і відкладене)
+    def test_snapshot_roundtrip(self):
+        import os
+        import tempfile
+        sim = Simulation()
+        sim.create_port(0, 50.45, 30.52)
+        sim.create_port(1, 46.48, 30.73)
+        ids = [sim.create_container(w, kind=k) for w, k in [(1000, None), (5000, None), (800, "R"), (900, "L")]]
+        for cid in ids:
+            sim.place_container_in_port(cid, 0)
+        spare = sim.create_container(2000)  # ніде не розміщений
+        sim.create_ship(7, 0, ShipSpecs(20000, 10, 5, 2, 2, 0.5, speedKMPerHour=20.0), fuel=123.5)
+        sim.load_many(7, ids[1:3])
+        path = os.path.join(tempfile.mkdtemp(), "world.snap")
+        sim.save(path)
+        for lazy in (False, True):
+            restored = Simulation.restore(path, lazy=lazy)
+            self.assertEqual(restored._next_container_id, sim._next_container_id)
+            self.assertEqual(restored.ports[0].containers_by_type(), sim.ports[0].containers_by_type())
+            ship = restored.ships[7]
+            self.assertEqual(ship.specs, sim.ships[7].specs)
+            self.assertEqual(ship.fuel, 123.5)
+            self.assertIs(ship.currentPort, restored.ports[0])
+            self.assertEqual(ship._counts(), sim.ships[7]._counts())
+            self.assertEqual(restored.containers[spare].weight, 2000)
+            self.assertTrue(restored.load(7, ids[3]))
+            self.assertEqual([c.ID for c in restored.ports[0].containers], [ids[0]])
+            restored.refuel(7, 20000.0)
+            self.assertTrue(restored.sail(7, 1))
+            self.assertEqual(len(restored.ports[1].containers), 3)
+        # Усі контейнери на кораблі – відкладене відновлення створює їх усі під час restore
+        sim = Simulation()
+        sim.create_port(0, 0.0, 0.0)
+        sim.create_ship(0, 0, ShipSpecs(5000, 5, 5, 5, 5, 0.1))
+        sim.place_container_in_port(sim.create_container(1000), 0)
+        self.assertTrue(sim.load(0, 0))
+        sim.create_port(1, 0.0, 0.0)
+        self.assertTrue(sim.depart(0, 1))             # у морі, рейс до порту 1
+        sim.save(path)
+        restored = Simulation.restore(path, lazy=True)
+        self.assertEqual(restored.ships[0]._counts(), sim.ships[0]._counts())
+        self.assertIs(restored.ships[0].destination, restored.ports[1])
+
+    # Тестуємо відтворення журналу команд з контрольною точкою
+    def test_command_replay(self):
+        import io
+        import json
+        import os
+        import tempfile
+        from itertools import islice
+        from lab2.ingest import Replayer, read_jsonl, replay
+        commands = [
+            {"op": "create_port", "id": 0, "lat": 0.0, "lon": 0.0},
+            {"op": "create_port", "id": 1, "lat": 0.0, "lon": 0.1},
+            {"op": "create_ship", "id": 0, "port": 0, "capacity": 10000, "max_all": 10, "max_heavy": 1,
+             "max_refrigerated": 1, "max_liquid": 1, "fuel_per_km": 0.1, "fuel": 500.0},
+            {"op": "create_container", "weight": 5000},
+            {"op": "create_container", "weight": 6000},
+            {"op": "place", "container": 0, "port": 0},
+            {"op": "place", "container": 1, "port": 0},
+            {"op": "load", "ship": 0, "container": 0},
+            {"op": "load", "ship": 0, "container": 1},
+            {"op": "sail", "ship": 0, "port": 1},
+            {"op": "load", "ship": "abc", "container": 1},
+            {"op": "load", "ship": 0, "container": None},
+            {"op": "explode"},
+        ]
+        path = os.path.join(tempfile.mkdtemp(), "log.jsonl")
+        with open(path, "w") as f:
+            f.writelines(json.dumps(c) + "\n" for c in commands)
+            # Зіпсовані рядки не зупиняють відтворення
+            f.write('{not json\n[1, 2]\n{"op": "place", "container": 1e400, "port": 0}\n')
+            f.write('{"op": ["load"]}\n{"op": "refuel", "ship": 0, "amount": 1.0}\n')
+        checkpoints = []
+        sim = Simulation()
+        out = io.StringIO()
+        # Перша частина: зупиняємося після 7 команд (одна порція)
+        with open(path, "rb") as f:
+            end = Replayer(sim, out, batch_size=7, checkpoint=checkpoints.append).run(islice(read_jsonl(f), 7))
+        self.assertEqual(checkpoints, [end])
+        # Продовжуємо з контрольної точки
+        replay(sim, path, out=out, start=end)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([r["ok"] for r in records], [True] * 8 + [False, True, False, False, False]
+                         + [False] * 4 + [True])
+        self.assertEqual(records[-1]["offset"], os.path.getsize(path))
+        self.assertIn("abc", records[10]["result"])
+        self.assertEqual(records[3]["result"], 0)
+        self.assertIn(sim.containers[0], sim.ports[1].containers)
+        self.assertIn(sim.containers[1], sim.ports[0].containers)
+
+        csv_path = os.path.join(tempfile.mkdtemp(), "log.csv")
+        with open(csv_path, "w") as f:
+            f.write("op,id,lat,lon,weight,kind,container,port\n")
+            f.write("create_port,5,1.0,2.0,,,,\ncreate_container,,,,700,R,,\nplace,,,,,,0,5\n")
+        sim = Simulation()
+        replay(sim, csv_path)
+        self.assertEqual(sim.ports[5].containers_by_type()["refrigerated_container"], [0])
+
+    # Тестуємо структурований експорт і режим змін (delta)
+    def test_state_export_delta(self):
+        import io
+        import json
+        sim = Simulation()
+        for pid in range(3):
+            sim.create_port(pid, 0.0, float(pid))
+        cid = sim.create_container(1000)
+        sim.place_container_in_port(cid, 0)
+        sim.create_ship(0, 0, ShipSpecs(10000, 10, 10, 10, 10, 0.1), fuel=1000.0)
+        out = io.StringIO()
+        self.assertEqual(sim.export_state(out), 4)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(records[0]["basic_container"], [cid])
+        self.assertEqual(records[0]["ships"], [0])
+        self.assertEqual(records[3], {"record": "ship", "id": 0, "port": 0, "fuel": 1000.0,
+                                      "basic_container": [], "heavy_container": [],
+                                      "refrigerated_container": [], "liquid_container": []})
+        # Нічого не змінилося – порожня дельта
+        self.assertEqual(sim.export_state(io.StringIO(), delta=True), 0)
+        sim.load(0, cid)
+        sim.sail(0, 2)
+        out = io.StringIO()
+        sim.export_state(out, delta=True)
+        changed = [(r["record"], r["id"]) for r in map(json.loads, out.getvalue().splitlines())]
+        self.assertEqual(changed, [("port", 0), ("port", 2), ("ship", 0)])
+        out = io.StringIO()
+        sim.export_state(out, fmt="csv")
+        self.assertEqual(len(out.getvalue().splitlines()), 5)
+
+    # Тестуємо перевірки бенчмарків: регресія відносно baseline і ріст складності
+    def test_benchmark_checks(self):
+        import json
+        from lab2.bench import BASELINE_PATH, bench_size, check_growth, compare
+        with open(BASELINE_PATH) as f:
+            self.assertIn("1000", json.load(f))
+        result = bench_size(1000, sample=50, repeats=1)
+        self.assertGreater(result["peak_memory_mb"], 0)
+        self.assertGreater(result["load"], 0)
+        baseline = {"1000": {"load": 1.0, "sail": 1.0}}
+        self.assertEqual(compare({"1000": {"load": 1.4, "sail": 0.5}}, baseline), [])
+        self.assertEqual(len(compare({"1000": {"load": 2.0, "sail": 1.0}}, baseline)), 1)
+        flat = {"load": 1.0, "unload": 1.0, "sail": 1.0, "getDistance": 1.0, "create_container": 1.0,
+                "containers_by_type": 1.0, "print_state": 1.0}
+        linear_load = dict(flat, load=10.0, print_state=10.0)
+        problems = check_growth({"1000": flat, "10000": linear_load})
+        self.assertEqual(len(problems), 1)
+        self.assertTrue(problems[0].startswith("load:"))
+
+    # Тестуємо метрики: лічильники, причини відмов, хук профілювання та формат Prometheus
+    def test_metrics(self):
+        sim = Simulation()
+        sim.create_port(0, 50.45, 30.52)
+        sim.create_port(1, 46.48, 30.73)
+        specs = ShipSpecs(6000, 2, 0, 0, 0, 1.0)
+        sim.create_ship(0, 0, specs, fuel=0.0)
+        ids = [sim.create_container(w) for w in (2000, 5000, 1000, 1000)]
+        for cid in ids[:3]:
+            sim.place_container_in_port(cid, 0)
+        self.assertTrue(sim.load(0, ids[0]))
+        self.assertEqual(sim.metrics_snapshot(), {})
+
+        calls = []
+        metrics = sim.enable_metrics(hook=lambda op, args, reason, seconds: calls.append((op, reason)))
+        self.assertFalse(sim.load(0, ids[1]))        # 7000 > 6000
+        self.assertFalse(sim.load(0, ids[3]))        # не в порту
+        self.assertFalse(sim.load(0, 999))
+        self.assertFalse(sim.load(9, ids[2]))
+        self.assertEqual(sim.load_many(0, [ids[2], ids[1], 999]), ([ids[2]], [ids[1], 999]))
+        self.assertFalse(sim.sail(0, 1))
+        with self.assertRaises(ValueError):
+            sim.refuel(0, -1.0)
+        with self.assertRaises(TypeError):
+            sim.load_many(0, None)
+
+        snap = sim.metrics_snapshot()
+        self.assertEqual(snap["load"]["calls"], 4)
+        self.assertEqual(snap["load"]["rejections"], {"weight_limit": 1, "wrong_port": 1,
+                                                      "unknown_container": 1, "unknown_ship": 1})
+        self.assertEqual(snap["load_many"]["rejections"], {"weight_limit": 1, "unknown_container": 1,
+                                                           "error_TypeError": 1})
+        self.assertEqual(snap["load_many"]["calls"], 2)
+        self.assertEqual(snap["sail"]["rejections"], {"no_fuel": 1})
+        self.assertEqual(snap["refuel"]["rejections"], {"error_ValueError": 1})
+        self.assertEqual(sum(snap["load"]["latency_buckets"].values()), 4)
+        self.assertEqual(calls[0], ("load", "weight_limit"))
+        self.assertEqual(calls[4], ("load_many", {"weight_limit": 1, "unknown_container": 1}))
+
+        text = metrics.to_prometheus()
+        self.assertIn('lab2_calls_total{op="load"} 4', text)
+        self.assertIn('lab2_rejections_total{op="sail",reason="no_fuel"} 1', text)
+        self.assertIn('lab2_latency_seconds_bucket{op="load",le="+Inf"} 4', text)
+        self.assertIn('lab2_latency_seconds_count{op="load_many"} 2', text)
+        sim.disable_metrics()
+        self.assertTrue(sim.unload(0, ids[0]))
+        self.assertEqual(sim.metrics_snapshot(), {})
+
+    # Тестуємо витрату палива з урахуванням вантажу та пакетне вивантаження при прибутті
+    def test_cargo_fuel_model(self):
+        sim = Simulation()
+        sim.create_port(0, 0.0, 0.0)
+        sim.create_port(1, 0.0, 1.0)
+        ids = [sim.create_container(w, kind=k) for w, k in [(1000, None), (5000, None), (2000, "R")]]
+        for cid in ids:
+            sim.place_container_in_port(cid, 0)
+        sim.create_ship(0, 0, ShipSpecs(20000, 10, 10, 10, 10, 500.0), fuel=100.0)
+        ship = sim.ships[0]
+        distance = sim.ports[0].getDistance(sim.ports[1])
+        self.assertAlmostEqual(sim.estimate_fuel(0, 1), distance * 0.5)
+        sim.load_many(0, ids)
+        cargo = sum(sim.containers[cid].consumption() for cid in ids)
+        self.assertAlmostEqual(ship._containers_consumption_per_km(), cargo)
+        self.assertAlmostEqual(sim.estimate_fuel(0, 1), distance * (0.5 + cargo))
+        sim.unload(0, ids[1])
+        cargo -= sim.containers[ids[1]].consumption()
+        self.assertAlmostEqual(ship.fuel_per_km(), 0.5 + cargo)
+        # Палива вистачає лише на порожній перехід
+        self.assertFalse(sim.sail(0, 1))
+        sim.refuel(0, distance * (0.5 + cargo))
+        self.assertTrue(sim.sail(0, 1))
+        self.assertEqual(sim.ports[1].containers_by_type()["refrigerated_container"], [ids[2]])
+        self.assertEqual(len(sim.ports[1].containers), 2)
+        self.assertEqual(ship.fuel_per_km(), 0.5)
+        with self.assertRaises(ValueError):
+            sim.ports[1].containers.extend([sim.containers[ids[0]]])
+
+    # Тестуємо журнал заходів у порти: запити та обмеження пам'яті
+    def test_traffic_ledger(self):
+        from lab2.events import EventEngine
+        from lab2.ledger import TrafficLedger
+        sim = Simulation()
+        for pid in range(3):
+            sim.create_port(pid, 0.0, float(pid))
+        specs = ShipSpecs(10000, 10, 10, 10, 10, 1.0)
+        sim.create_ship(0, 0, specs, fuel=1000.0)
+        sim.create_ship(1, 0, specs, fuel=1000.0)
+        engine = EventEngine(sim)
+        engine.schedule_sail(1.0, 0, 1)
+        engine.schedule_sail(2.0, 1, 1)
+        engine.run_until(100.0)
+        port = sim.ports[1]
+        self.assertEqual(list(port.current), [sim.ships[0], sim.ships[1]])
+        self.assertEqual(sim.ports[0].history, [sim.ships[0], sim.ships[1]])
+        ledger = sim.ledger
+        self.assertEqual(ledger.visit_count(1), 2)
+        self.assertEqual(ledger.last_visitors(1, 5), [1, 0])
+        hours = sim.ports[0].getDistance(port) / specs.speedKMPerHour
+        first, second = ledger.itinerary(0)
+        self.assertEqual(first[:2], (0, 0))
+        self.assertEqual(first[3], 1.0)
+        self.assertEqual(second[1], 1)
+        self.assertAlmostEqual(second[2], 1.0 + hours)
+        self.assertIsNone(second[3])
+
+        archived = []
+        small = TrafficLedger(max_records=4, on_rollover=archived.extend)
+        small.arrive(9, 0)                       # залишається в порту весь час
+        for i in range(6):
+            small.arrive(i, 1)
+            small.depart(i, 1)
+        self.assertLessEqual(len(small), 4 + 1)     # відкритий візит корабля 9 не рахується
+        self.assertEqual(small.visit_count(1), 6)
+        self.assertEqual(small.last_visitors(1, 2), [5, 4])
+        self.assertTrue(all(v[3] is not None for v in archived))
+        small.depart(9, 0)
+        # Закритий візит корабля 9 – найстаріший у журналі, тож наступне відкидання архівує саме його
+        self.assertIn(9, [v[0] for v in archived])
+
+        # Довго відкритий візит лишається найстарішим, а не "найновішим" після відкидання
+        ordered = TrafficLedger(max_records=4)
+        ordered.arrive(9, 1)
+        for i in range(6):
+            ordered.arrive(i, 1)
+            ordered.depart(i, 1)
+        self.assertEqual(ordered.last_visitors(1, 10)[0], 5)
+        self.assertEqual(ordered.last_visitors(1, 10)[-1], 9)
+        self.assertEqual([v[0] for v in ordered.visits(1)][0], 9)
+
+        # Кораблів у портах більше за max_records: журнал не переписується на кожному прибутті
+        docked = TrafficLedger(max_records=100)
+        for sid in range(5000):
+            docked.arrive(sid, sid % 7)
+        self.assertEqual(len(docked), 5000)
+        for sid in range(300):
+            docked.depart(sid, sid % 7)
+        self.assertLessEqual(len(docked) - (5000 - 300), 100)
+        self.assertEqual(docked.last_visitors(3, 1), [4994])
+        self.assertIsNotNone(docked.itinerary(299)[-1][3])
+
+    # Тестуємо просторовий індекс портів: найближчі, в радіусі і досяжні кораблем
+    def test_spatial_index(self):
+        import random
+        from lab2.port import Port
+        rng = random.Random(3)
+        sim = Simulation()
+        for pid in range(300):
+            sim.create_port(pid, rng.uniform(-70.0, 70.0), rng.uniform(-180.0, 180.0))
+        probe = Port(-1, 10.0, 20.0)
+        brute = sorted((probe.getDistance(p), p.ID) for p in sim.ports.values())
+        nearest = sim.nearest_ports(10.0, 20.0, k=3)
+        self.assertEqual([pid for pid, _ in nearest], [pid for _, pid in brute[:3]])
+        self.assertAlmostEqual(nearest[0][1], brute[0][0], places=6)
+        origin = sim.ports[0]
+        expected = sorted(p.ID for p in sim.ports.values() if p.ID != 0 and origin.getDistance(p) <= 2500.0)
+        self.assertEqual(sorted(pid for pid, _ in sim.within_radius(0, 2500.0)), expected)
+        # 1 одиниця палива на км, паливо – на 2500 км
+        sim.create_ship(0, 0, ShipSpecs(10000, 10, 10, 10, 10, 1000.0), fuel=2500.0)
+        self.assertEqual(sorted(pid for pid, _ in sim.reachable(0)), expected)
+        # Груба сітка: пошук по клітинках (без повного перегляду) дає той самий результат
+        from lab2.spatial import SpatialIndex
+        grid = SpatialIndex(cell_km=2000.0)
+        for p in sim.ports.values():
+            grid.add(p.ID, p.latitude, p.longitude)
+        self.assertEqual(grid.within_radius(0, 300.0), sim.within_radius(0, 300.0))
+        self.assertEqual(grid.nearest(10.0, 20.0, 3), nearest)
+
+    # Тестуємо асинхронний сервіс: конвеєр команд, об'єднання в порції і запити на читання
+    @unittest.skipIf(not hasattr(__import__("asyncio"), "start_unix_server"), "Unix sockets are not available")
+    def test_command_service(self):
+        import asyncio
+        import os
+        import tempfile
+        from lab2.service import SimulationService, load_generator
+        sim = Simulation()
+        sim.create_port(0, 0.0, 0.0)
+        sim.create_port(1, 0.0, 1.0)
+        ids = [sim.create_container(1000) for _ in range(20)]
+        for cid in ids:
+            sim.place_container_in_port(cid, 0)
+        sim.create_ship(0, 0, ShipSpecs(100000, 100, 100, 100, 100, 1.0), fuel=10000.0)
+        path = os.path.join(tempfile.mkdtemp(), "sim.sock")
+
+        async def scenario():
+            service = SimulationService(sim, max_pipeline=8)
+            await service.start(path)
+            try:
+                loads = [{"op": "load", "ship": 0, "container": cid} for cid in ids]
+                report = await load_generator(path, loads + [{"op": "explode"}], connections=1, pipeline=32)
+                after = await load_generator(path, [{"op": "ship", "ship": 0}, {"op": "sail", "ship": 0, "port": 1},
+                                                    {"op": "estimate_fuel", "ship": 0, "port": 5}])
+                # Хибна команда не зупиняє записувача: наступні зміни отримують відповідь
+                bad = await load_generator(path, [{"op": "load", "ship": "x", "container": 1}], connections=1)
+                # Виняток в обробнику відхиляє лише свою команду: дозаправка в тій самій порції проходить
+                sim.unload = lambda *args: 1 / 0
+                fuel = sim.ships[0].fuel
+                mixed = await asyncio.wait_for(load_generator(path, [
+                    {"op": "unload", "ship": 0, "container": 0}, {"op": "refuel", "ship": 0, "amount": 1.0},
+                    {"op": ["ship"]}, {"op": "ship", "ship": 1e400}], connections=1), 5.0)
+                del sim.unload
+                after.update(bad=bad["responses"][0], crash=mixed["responses"][0], good=mixed["responses"][1],
+                             bad_op=mixed["responses"][2], bad_query=mixed["responses"][3])
+                after["refuelled"] = sim.ships[0].fuel - fuel
+                return service, report, after
+            finally:
+                await service.close()
+
+        service, report, after = asyncio.run(scenario())
+        responses = report["responses"]
+        self.assertTrue(all(responses[i]["ok"] for i in range(20)))
+        self.assertFalse(responses[20]["ok"])
+        self.assertEqual(report["errors"], 1)
+        self.assertGreaterEqual(report["p99_ms"], report["p50_ms"])
+        self.assertEqual(service.applied, 24)
+        self.assertLess(service.version, service.applied)   # команди виконувались порціями
+        self.assertEqual(after["responses"][0]["result"]["basic_container"], ids)
+        self.assertTrue(after["responses"][1]["ok"])
+        self.assertFalse(after["responses"][2]["ok"])
+        self.assertIs(sim.ships[0].currentPort, sim.ports[1])
+        self.assertFalse(after["bad"]["ok"])
+        self.assertIn("ZeroDivisionError", after["crash"]["result"])
+        self.assertTrue(after["good"]["ok"])
+        self.assertEqual(after["refuelled"], 1.0)
+        self.assertFalse(after["bad_op"]["ok"])
+        self.assertFalse(after["bad_query"]["ok"])
+
+    # Тестуємо розподіл симуляції між процесами за регіонами: результат той самий, що й без шардів
+    def test_sharded_simulation(self):
+        import io
+        import json
+        import multiprocessing
+        from lab2.sharding import SHARD_OPS, ShardedSimulation
+
+        def scenario(sim):
+            for pid, lon in enumerate((-1.0, -2.0, 1.0, 2.0)):
+                sim.create_port(pid, 0.0, lon)
+            ids = [sim.create_container(w, kind=k) for w, k in [(1000, None), (5000, None), (800, "R"), (900, "L")]]
+            for cid in ids[:3]:
+                sim.place_container_in_port(cid, 0)
+            sim.place_container_in_port(ids[3], 2)
+            specs = ShipSpecs(20000, 10, 5, 2, 2, 1.0)
+            sim.create_ship(0, 0, specs, fuel=5000.0)
+            sim.create_ship(1, 2, specs, fuel=20.0)
+            results = [sim.load_many(0, ids), sim.load(1, ids[0]), sim.estimate_fuel(0, 2),
+                       sim.sail(0, 2),                      # між регіонами
+                       sim.load(1, ids[1]), sim.load(1, ids[3]),
+                       sim.sail(1, 3),                      # у межах регіону, палива не вистачає
+                       sim.refuel(1, 5000.0), sim.sail(1, 3), sim.sail(0, 1)]
+            text, lines = io.StringIO(), io.StringIO()
+            sim.export_state(text, fmt="text")
+            sim.export_state(lines, fmt="jsonl")
+            return results, text.getvalue(), lines.getvalue()
+
+        expected = scenario(Simulation())
+        with ShardedSimulation(n_shards=2) as sharded:
+            actual = scenario(sharded)
+            self.assertEqual(sharded.port_shard, {0: 0, 1: 0, 2: 1, 3: 1})
+            self.assertEqual(sharded.ship_shard, {0: 0, 1: 1})
+        self.assertEqual(actual[0][:3], expected[0][:3])
+        self.assertAlmostEqual(actual[0][2], expected[0][2], places=6)
+        self.assertEqual(actual[0][3:], expected[0][3:])
+        self.assertEqual(actual[1], expected[1])
+        self.assertEqual(actual[2], expected[2])
+
+        # Контейнер, що прибув у порт одного регіону, переноситься в порт іншого
+        with ShardedSimulation(n_shards=2) as sharded:
+            sharded.create_port(0, 0.0, -1.0)
+            sharded.create_port(1, 0.0, 1.0)
+            cid = sharded.create_container(800, kind="R")
+            sharded.place_container_in_port(cid, 1)
+            sharded.create_ship(0, 0, ShipSpecs(20000, 10, 5, 2, 2, 1.0), fuel=5000.0)
+            sharded.place_container_in_port(cid, 0)
+            self.assertEqual(sharded.container_shard[cid], 0)
+            self.assertTrue(sharded.load(0, cid))
+            with self.assertRaises(ValueError):
+                sharded.place_container_in_port(cid, 1)   # на борту корабля
+            # У межах регіону розміщення теж переносить контейнер, а не копіює
+            sharded.create_port(2, 0.0, -2.0)
+            other = sharded.create_container(1000)
+            sharded.place_container_in_port(other, 0)
+            sharded.place_container_in_port(other, 2)
+            lines = io.StringIO()
+            sharded.export_state(lines, fmt="jsonl")
+            ports = {r["id"]: r for r in map(json.loads, lines.getvalue().splitlines()) if r["record"] == "port"}
+            self.assertEqual(ports[0]["basic_container"], [])
+            self.assertEqual(ports[2]["basic_container"], [other])
+
+            # Пакетні методи: шарди виконують свої частини паралельно
+            sharded.create_ship(1, 2, ShipSpecs(20000, 10, 5, 2, 2, 1.0), fuel=5000.0)
+            self.assertEqual(sharded.load_many_batch([(1, [other, cid]), (9, [other])]),
+                             [([other], [cid]), ([], [other])])
+            self.assertEqual(sharded.sail_many([(0, 1), (1, 0), (5, 0)]), [True, True, False])
+            self.assertEqual(sharded.ship_shard, {0: 1, 1: 0})
+            self.assertEqual(sharded.container_shard[cid], 1)
+            with self.assertRaises(ValueError):
+                sharded.sail_many([(0, 0), (0, 1)])
+
+        # Збій прийому в шарді призначення: корабель з вантажем лишається в шарді відправлення
+        if multiprocessing.get_start_method() == "fork":
+            def broken_handoff_in(sim, state, dest_id):
+                raise RuntimeError("destination shard failed")
+            original = SHARD_OPS["handoff_in"]
+            SHARD_OPS["handoff_in"] = broken_handoff_in
+            try:
+                sharded = ShardedSimulation(n_shards=2)
+            finally:
+                SHARD_OPS["handoff_in"] = original
+            with sharded:
+                sharded.create_port(0, 0.0, -1.0)
+                sharded.create_port(1, 0.0, 1.0)
+                cid = sharded.create_container(800)
+                sharded.place_container_in_port(cid, 0)
+                sharded.create_ship(0, 0, ShipSpecs(20000, 10, 5, 2, 2, 1.0), fuel=5000.0)
+                self.assertTrue(sharded.load(0, cid))
+                with self.assertRaises(RuntimeError):
+                    sharded.sail(0, 1)
+                self.assertEqual(sharded.ship_shard[0], 0)
+                self.assertEqual(sharded.container_shard[cid], 0)
+                self.assertTrue(sharded.unload(0, cid))
+
+    # Тестуємо компактні об'єкти: без __dict__, групування за кодом типу, бюджет пам'яті
+    def test_compact_objects(self):
+        from lab2.containers import Container
+        from lab2.port import Port
+        from lab2.ship import Ship
+        port = Port(0, 0.0, 0.0)
+        ship = Ship(0, port, ShipSpecs(20000, 10, 10, 10, 10, 1.0))
+        for obj in (BasicContainer(0, 1000), LiquidContainer(1, 1000), port, ship):
+            self.assertFalse(hasattr(obj, "__dict__"))
+        with self.assertRaises(AttributeError):
+            ship.speed = 10
+        self.assertTrue(issubclass(LiquidContainer, HeavyContainer) and issubclass(HeavyContainer, Container))
+        conts = [BasicContainer(3, 1000), RefrigeratedContainer(1, 1000), HeavyContainer(2, 5000),
+                 LiquidContainer(0, 1000), BasicContainer(4, 500)]
+        port.containers.extend(conts)
+        self.assertEqual(ship.load_many(conts)[0], [3, 1, 2, 0, 4])
+        self.assertEqual(ship.containers_by_type(), {"basic_container": [3, 4], "heavy_container": [2],
+                                                     "refrigerated_container": [1], "liquid_container": [0]})
+        self.assertEqual(ship._counts(), {"total": 5, "heavy": 3, "refrigerated": 1, "liquid": 1,
+                                          "weight_sum": 8500})
 
 if __name__ == "__main__":
     unittest.main()